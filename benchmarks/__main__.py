@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+
+from datetime import datetime, timezone
+
+from benchmarks.environment import setup
+
+
+def get_git_commit():
+    """Gets the current git commit, or None if it cannot be found."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, baseline: dict=None):
+    """
+    Prints a table of the scenario results.
+
+    :param results: The results of the run.
+    :param baseline: The results of a previous run to compare with.
+    """
+    header = f'{"scenario":<26}{"median ms":>12}{"p95 ms":>12}{"queries":>9}'
+    if baseline is not None:
+        header += f'{"base ms":>12}{"change":>10}'
+    print(header)
+
+    for name, result in results['scenarios'].items():
+        line = (
+            f'{name:<26}{result["median_ms"]:>12.2f}{result["p95_ms"]:>12.2f}'
+            f'{str(result["queries"]):>9}'
+        )
+
+        base = (baseline['scenarios'].get(name) if baseline is not None else None)
+        if base is not None:
+            change = (result['median_ms'] - base['median_ms']) / base['median_ms'] * 100
+            line += f'{base["median_ms"]:>12.2f}{change:>+9.1f}%'
+
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmarks Installies against a synthetic catalog.',
+    )
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--apps', type=int, default=100)
+    parser.add_argument('--scripts-per-app', type=int, default=5)
+    parser.add_argument('--threads-per-app', type=int, default=2)
+    parser.add_argument('--comments-per-thread', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--scenario', action='append', help='Only run this scenario. Can be repeated.')
+    parser.add_argument(
+        '--config',
+        help='An Installies config file to use instead of a temporary SQLite one, e.g. for a local MySQL.',
+    )
+    parser.add_argument(
+        '--recreate',
+        action='store_true',
+        help='Allow dropping and recreating the tables of the database in --config.',
+    )
+    parser.add_argument(
+        '--storage',
+        choices=['files', 'pack', 'memory'],
+        default='files',
+        help='The storage to keep the scripts in, if no --config is given.',
+    )
+    parser.add_argument('--output', help='The JSON file to write the results to.')
+    parser.add_argument('--compare', help='A JSON results file to compare the results with.')
+    args = parser.parse_args()
+
+    if args.config is not None and args.recreate is False:
+        parser.error('--config drops all the tables in its database, pass --recreate to allow it.')
+
+    # installies reads its config when it is imported, so it is only
+    # imported after the config is set.
+    setup(args.config, args.storage)
+
+    from benchmarks.generate import generate_catalog
+    from benchmarks.scenarios import run_scenarios
+
+    catalog = generate_catalog(
+        users=args.users,
+        apps=args.apps,
+        scripts_per_app=args.scripts_per_app,
+        threads_per_app=args.threads_per_app,
+        comments_per_thread=args.comments_per_thread,
+        seed=args.seed,
+    )
+
+    results = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'commit': get_git_commit(),
+            'python': platform.python_version(),
+            'config': (args.config if args.config is not None else 'sqlite'),
+            'storage': (args.storage if args.config is None else None),
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+        },
+        'catalog': catalog,
+        'scenarios': run_scenarios(
+            catalog,
+            repeat=args.repeat,
+            warmup=args.warmup,
+            only=args.scenario,
+        ),
+    }
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    output = args.output
+    if output is None:
+        results_directory = os.path.join(os.path.dirname(__file__), 'results')
+        os.makedirs(results_directory, exist_ok=True)
+        output = os.path.join(
+            results_directory,
+            f'{datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")}.json',
+        )
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import subprocess
+import sys
+
+from benchmarks.environment import setup
+
+# the blueprints whose routes are checked
+BLUEPRINTS = ['app_manager', 'app_library', 'api', 'auth', 'admin']
+
+# routes that redirect logged in users, so they are requested without a session
+ANONYMOUS_ENDPOINTS = [
+    'auth.signup',
+    'auth.login',
+    'auth.verify_user',
+    'auth.forgot_password',
+    'auth.reset_password',
+]
+
+# routes that change data when requested with GET
+SKIPPED_ENDPOINTS = [
+    'auth.logout',
+    'auth.verify_user',
+]
+
+# the max amount of queries each route can make. Routes that are not listed
+# use the default budget. A route also fails if it makes more queries the more
+# objects are on the page, no matter its budget.
+DEFAULT_BUDGET = 10
+BUDGETS = {
+    'app_library.index': 15,
+}
+
+# every storage is checked, since some of them make queries of their own
+STORAGES = ['files', 'pack', 'memory']
+
+# the page sizes to request each route with
+SMALL_PAGE_SIZE = 2
+LARGE_PAGE_SIZE = 10
+
+
+def get_url_values(catalog: dict, report_id: int, reset_token: str, verify_string: str) -> dict:
+    """
+    Gets values for the variables in the routes' urls.
+
+    :param catalog: The dict returned by ``generate_catalog``.
+    :param report_id: The id of a report.
+    :param reset_token: The token of a password reset request.
+    :param verify_string: A user's verify string.
+    """
+    return {
+        'app_name': catalog['sample_app'],
+        'script_id': catalog['sample_script_id'],
+        'thread_id': catalog['sample_thread_id'],
+        'comment_id': catalog['sample_comment_id'],
+        'username': catalog['sample_username'],
+        'report_id': report_id,
+        'token': reset_token,
+        'verify_string': verify_string,
+        'revision_number': 1,
+    }
+
+
+def count_queries(client, path: str, per_page: int):
+    """
+    Requests a path, and returns the status code and the amount of queries it made.
+
+    :param client: The test client.
+    :param path: The path to request.
+    :param per_page: The page size to request.
+    """
+    response = client.get(path, query_string={'per-page': per_page})
+    return response.status_code, int(response.headers['X-Query-Count'])
+
+
+def check_budgets(catalog: dict) -> list[dict]:
+    """
+    Requests every GET route of the checked blueprints, and returns a list of results.
+
+    :param catalog: The dict returned by ``generate_catalog``.
+    """
+    from flask import url_for
+    from installies.app import app
+    from installies.models.app import App
+    from installies.models.report import Report, ReportAppInfo
+    from installies.models.user import User, Session, PasswordResetRequest
+
+    user = User.get(User.username == catalog['sample_username'])
+    app_object = App.get(App.name == catalog['sample_app'])
+
+    report = Report.create(title='Benchmark', body='Benchmark', report_type='app', submitter=user)
+    ReportAppInfo.create(report=report, app=app_object)
+    reset_request = PasswordResetRequest.create(user=user, token='benchmark-reset-token')
+    session_token = Session.create(user=user).token
+
+    values = get_url_values(catalog, report.id, reset_request.token, user.verify_string)
+
+    results = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.endpoint):
+        if rule.endpoint.split('.')[0] not in BLUEPRINTS:
+            continue
+
+        if 'GET' not in rule.methods or rule.endpoint in SKIPPED_ENDPOINTS:
+            continue
+
+        with app.test_request_context():
+            path = url_for(rule.endpoint, **{name: values[name] for name in rule.arguments})
+
+        client = app.test_client()
+        if rule.endpoint not in ANONYMOUS_ENDPOINTS:
+            client.set_cookie('user-token', session_token)
+
+        # the first request fills the session cache, so it is not counted
+        client.get(path)
+
+        status_code, small_count = count_queries(client, path, SMALL_PAGE_SIZE)
+        _, large_count = count_queries(client, path, LARGE_PAGE_SIZE)
+
+        budget = BUDGETS.get(rule.endpoint, DEFAULT_BUDGET)
+
+        problems = []
+        if large_count > budget:
+            problems.append(f'made {large_count} queries, the budget is {budget}')
+        if large_count > small_count:
+            problems.append(
+                f'made {small_count} queries with {SMALL_PAGE_SIZE} per page, '
+                f'but {large_count} with {LARGE_PAGE_SIZE}'
+            )
+
+        results.append({
+            'endpoint': rule.endpoint,
+            'path': path,
+            'status_code': status_code,
+            'queries': large_count,
+            'small_page_queries': small_count,
+            'budget': budget,
+            'problems': problems,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.budget',
+        description='Checks that every route stays within its query budget.',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--storage',
+        choices=STORAGES,
+        help='Only check with this storage, instead of every one.',
+    )
+    args = parser.parse_args()
+
+    # the storage is picked when installies is imported, so each one is checked in its own process
+    if args.storage is None:
+        failed = []
+        for storage in STORAGES:
+            print(f'Checking with the {storage} storage.')
+            command = [sys.executable, '-m', 'benchmarks.budget', '--seed', str(args.seed), '--storage', storage]
+            if subprocess.run(command).returncode != 0:
+                failed.append(storage)
+
+        if failed != []:
+            print(f'Failed with the {", ".join(failed)} storage.')
+            sys.exit(1)
+
+        return
+
+    setup(storage=args.storage)
+
+    from benchmarks.generate import generate_catalog
+
+    # every list has more objects than the large page size, so pages are full
+    catalog = generate_catalog(
+        users=LARGE_PAGE_SIZE + 2,
+        apps=LARGE_PAGE_SIZE + 2,
+        scripts_per_app=LARGE_PAGE_SIZE + 2,
+        threads_per_app=LARGE_PAGE_SIZE + 2,
+        comments_per_thread=LARGE_PAGE_SIZE + 2,
+        seed=args.seed,
+    )
+
+    results = check_budgets(catalog)
+
+    print(f'{"endpoint":<40}{"status":>8}{"queries":>9}{"small":>7}{"budget":>8}')
+    for result in results:
+        print(
+            f'{result["endpoint"]:<40}{result["status_code"]:>8}{result["queries"]:>9}'
+            f'{result["small_page_queries"]:>7}{result["budget"]:>8}'
+        )
+
+    failures = [result for result in results if result['problems'] != []]
+    for result in failures:
+        for problem in result['problems']:
+            print(f'FAIL {result["endpoint"]} ({result["path"]}): {problem}')
+
+    if failures != []:
+        sys.exit(1)
+
+    print(f'All {len(results)} routes are within their query budgets with the {args.storage} storage.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import sys
+
+from benchmarks.environment import setup
+
+
+def check_collect() -> list[str]:
+    """
+    Collects unused blobs with the compact command, and returns a list of problems.
+
+    Each blob has to be deleted in its own transaction, so the blobs collected
+    before it are committed by the time its data is deleted.
+    """
+    import sqlite3
+    from installies.config import database
+    from installies.database.compact import compact
+    from installies.models.script import ScriptBlob
+    from installies.storage import storage
+
+    unused_hashes = []
+    with database.connection_context():
+        for i in range(3):
+            blob = ScriptBlob.store(f'echo "unused {i}"\n')
+            ScriptBlob.release(blob.hash)
+            unused_hashes.append(blob.hash)
+
+    problems = []
+    collected = []
+
+    # another connection only sees what is committed
+    reader = sqlite3.connect(database.database)
+    table = ScriptBlob._meta.table_name
+
+    delete = storage.delete
+
+    def checked_delete(key: str):
+        if key in unused_hashes:
+            for content_hash in collected:
+                row = reader.execute(f'SELECT 1 FROM {table} WHERE hash = ?', (content_hash,)).fetchone()
+                if row is not None:
+                    problems.append(f'{content_hash} was not committed before the next blob was collected')
+
+            collected.append(key)
+
+        delete(key)
+
+    storage.delete = checked_delete
+    try:
+        compact(0.5)
+    finally:
+        del storage.delete
+        reader.close()
+
+    for content_hash in unused_hashes:
+        if ScriptBlob.get_or_none(ScriptBlob.hash == content_hash) is not None:
+            problems.append(f'{content_hash} was not collected')
+        if storage.exists(content_hash):
+            problems.append(f'the data of {content_hash} was not deleted')
+
+    return problems
+
+
+def check_fsync() -> list[str]:
+    """
+    Writes files with each fsync policy, and returns a list of problems.
+
+    The none policy never syncs, the always policy syncs each file and its
+    directory, and the interval policy syncs the files and directories together
+    when it is flushed.
+    """
+    import os
+    import tempfile
+    from installies.lib.files import FileSyncer, write_file_atomic
+
+    file_count = 5
+
+    # the amount of syncs each policy makes while writing, and when it is flushed
+    expected = {
+        'none': (0, 0),
+        'always': (file_count * 2, 0),
+        'interval': (0, file_count + 1),
+    }
+
+    problems = []
+    fsync = os.fsync
+    calls = []
+
+    def counted_fsync(fd: int):
+        calls.append(fd)
+        fsync(fd)
+
+    os.fsync = counted_fsync
+    try:
+        for policy, (write_syncs, flush_syncs) in expected.items():
+            # the interval is long enough that the timer does not flush during the check
+            syncer = FileSyncer(policy, interval=60)
+            directory = tempfile.mkdtemp(prefix='installies-check-')
+
+            calls.clear()
+            for i in range(file_count):
+                write_file_atomic(os.path.join(directory, f'file-{i}'), b'data', syncer)
+
+            if len(calls) != write_syncs:
+                problems.append(f'the {policy} policy made {len(calls)} syncs while writing, not {write_syncs}')
+
+            calls.clear()
+            syncer.flush()
+
+            if len(calls) != flush_syncs:
+                problems.append(f'the {policy} policy made {len(calls)} syncs when flushed, not {flush_syncs}')
+    finally:
+        os.fsync = fsync
+
+    return problems
+
+
+# the checks that are run, by name
+CHECKS = {
+    'collect': check_collect,
+    'fsync': check_fsync,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.checks',
+        description='Checks how script content is written and deleted.',
+    )
+    parser.add_argument('--check', choices=list(CHECKS), help='Only run this check, instead of every one.')
+    args = parser.parse_args()
+
+    setup()
+
+    from benchmarks.generate import generate_catalog
+
+    generate_catalog(users=2, apps=2, scripts_per_app=2, threads_per_app=0, comments_per_thread=0)
+
+    names = list(CHECKS) if args.check is None else [args.check]
+
+    failed = False
+    for name in names:
+        for problem in CHECKS[name]():
+            print(f'FAIL {name}: {problem}')
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+    print(f'All {len(names)} checks passed.')
+
+
+if __name__ == '__main__':
+    main()
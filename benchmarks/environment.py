@@ -0,0 +1,84 @@
+import configparser
+import os
+import sys
+import tempfile
+
+
+def write_config(directory: str, engine: str='sqlite', storage: str='files') -> str:
+    """
+    Writes an Installies config file for benchmarking, and returns its path.
+
+    The database and uploaded scripts are put in the given directory.
+
+    :param directory: The directory to put the config, database, and scripts in.
+    :param engine: The database engine to use.
+    :param storage: The storage to keep the scripts' content in.
+    """
+    upload_path = os.path.join(directory, 'scripts')
+    os.makedirs(upload_path, exist_ok=True)
+
+    config = configparser.ConfigParser()
+    config.optionxform = str
+
+    config['server'] = {
+        'Host': '127.0.0.1',
+        'Port': '8000',
+        'Protocol': 'http',
+        'DebugMode': 'no',
+        'QueryStatsHeaders': 'yes',
+    }
+    config['database'] = {
+        'Engine': engine,
+        'Name': os.path.join(directory, 'installies.db'),
+        'FullTextSearch': 'yes',
+    }
+    config['script'] = {
+        'UploadPath': upload_path,
+        'MaxLength': '100000',
+        'Storage': storage,
+    }
+    config['email'] = {
+        'Enabled': 'no',
+        'User': 'benchmark@localhost',
+        'Passwd': '',
+        'SMTPAddr': 'localhost',
+        'SMTPPort': '25',
+    }
+
+    config_path = os.path.join(directory, 'config.ini')
+    with open(config_path, 'w') as f:
+        config.write(f)
+
+    return config_path
+
+
+def use_config(config_path: str):
+    """
+    Makes Installies use a config file.
+
+    This has to be called before anything from Installies is imported.
+
+    :param config_path: The path to the config file.
+    """
+    os.environ['INSTALLIES_CONFIG'] = config_path
+
+
+def setup(config_path: str=None, storage: str='files') -> str:
+    """
+    Sets up Installies for benchmarking, and returns the config path.
+
+    If no config path is given, a config that uses a temporary SQLite database
+    is written. This has to be called before anything from Installies is imported.
+
+    :param config_path: The path to a config file to use.
+    :param storage: The storage to keep the scripts' content in, if no config path is given.
+    """
+    if config_path is None:
+        config_path = write_config(tempfile.mkdtemp(prefix='installies-benchmark-'), storage=storage)
+
+    use_config(config_path)
+
+    # lets the benchmarks run from the repository without installing installies
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+    return config_path
@@ -0,0 +1,162 @@
+import random
+
+from installies.config import database
+from installies.database.database import recreate_database
+from installies.lib.random import gen_random_string
+from installies.lib.shell import Shell
+from installies.models.app import App
+from installies.models.discussion import Thread, Comment
+from installies.models.script import Script
+from installies.models.supported_distros import SupportedDistro
+from installies.models.user import User
+
+PASSWORD = 'benchmark-password'
+
+WORDS = [
+    'editor', 'browser', 'terminal', 'compiler', 'player', 'server', 'client', 'manager',
+    'viewer', 'launcher', 'monitor', 'toolkit', 'library', 'driver', 'emulator', 'game',
+    'python', 'rust', 'wine', 'steam', 'audio', 'video', 'image', 'network', 'backup',
+    'shell', 'font', 'theme', 'office', 'mail', 'chat', 'music', 'photo', 'sync',
+]
+DISTROS = ['arch', 'debian', 'ubuntu', 'fedora', 'gentoo', 'void', 'alpine', 'opensuse', '*']
+ARCHITECTURES = ['x86_64', 'aarch64', 'i686', 'armv7']
+ACTIONS = ['install', 'remove', 'update', 'compile']
+
+
+def generate_script_content(rng: random.Random, actions: list[str]) -> str:
+    """
+    Generates the content of a script with a function for each action.
+
+    :param rng: The random number generator.
+    :param actions: The actions of the script.
+    """
+    functions = []
+    for action in actions:
+        lines = '\n'.join(
+            f'    echo "{action} step {i}: {rng.choice(WORDS)}"'
+            for i in range(rng.randint(3, 30))
+        )
+        functions.append(f'{action}() {{\n{lines}\n}}\n')
+
+    return '\n'.join(functions)
+
+
+def generate_catalog(
+        users: int=20,
+        apps: int=100,
+        scripts_per_app: int=5,
+        threads_per_app: int=2,
+        comments_per_thread: int=5,
+        seed: int=0,
+) -> dict:
+    """
+    Recreates the database, and fills it with a synthetic catalog.
+
+    Returns a dict with the amount of each object created, and sample data for
+    the scenarios to use.
+
+    :param users: The amount of users.
+    :param apps: The amount of apps.
+    :param scripts_per_app: The amount of scripts each app has.
+    :param threads_per_app: The amount of user created threads each app has.
+    :param comments_per_thread: The amount of comments in each thread.
+    :param seed: The seed for the random number generator.
+    """
+    rng = random.Random(seed)
+    shells = Shell.get_all_names()
+
+    recreate_database()
+
+    with database.atomic():
+        # hashing passwords is slow, so all the users share one hash.
+        password = User.hash_password(PASSWORD)
+        User.insert_many([
+            {
+                'username': f'user{i}',
+                'email': f'user{i}@example.com',
+                'password': password,
+                'verify_string': gen_random_string(50),
+                'verified': True,
+                'admin': (i == 0),
+            }
+            for i in range(users)
+        ]).execute()
+        all_users = list(User.select().order_by(User.id))
+
+        script_count = 0
+        comment_count = 0
+        app_names = []
+
+        for i in range(apps):
+            name = f'{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}'
+            app = App.create(
+                name=name,
+                display_name=name.replace('-', ' ').title(),
+                description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 20))),
+                submitter=rng.choice(all_users),
+            )
+            app.maintainers.add_maintainer(rng.choice(all_users))
+            app_names.append(name)
+
+            for _ in range(scripts_per_app):
+                actions = rng.sample(ACTIONS, rng.randint(1, len(ACTIONS)))
+                script = Script.create(
+                    content=generate_script_content(rng, actions),
+                    description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))),
+                    shell=rng.choice(shells),
+                    submitter=rng.choice(all_users),
+                    app=app,
+                    actions=actions,
+                    version=rng.choice([None, '1.0', '2.1.3']),
+                )
+                SupportedDistro.create_from_dict(
+                    script,
+                    {
+                        distro: rng.sample(ARCHITECTURES, rng.randint(0, 2))
+                        for distro in rng.sample(DISTROS, rng.randint(1, 3))
+                    },
+                )
+                script_count += 1
+
+            for _ in range(threads_per_app):
+                thread = Thread.create(
+                    title=' '.join(rng.choice(WORDS) for _ in range(4)),
+                    creator=rng.choice(all_users),
+                    app=app,
+                )
+                for _ in range(comments_per_thread):
+                    Comment.create(
+                        thread=thread,
+                        creator=rng.choice(all_users),
+                        content=' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))),
+                    )
+                    comment_count += 1
+
+    sample_app = App.get(App.name == app_names[0])
+    sample_script = sample_app.scripts.order_by(Script.id).first()
+    sample_thread = (
+        sample_app.threads
+        .where(Thread.creator.is_null(False))
+        .order_by(Thread.id)
+        .first()
+    )
+    sample_comment = (
+        sample_thread.comments.order_by(Comment.id).first()
+        if sample_thread is not None else None
+    )
+
+    return {
+        'users': users,
+        'apps': apps,
+        'scripts': script_count,
+        'threads': apps * (threads_per_app + scripts_per_app),
+        'comments': comment_count,
+        'seed': seed,
+        'sample_app': sample_app.name,
+        'sample_script_id': (sample_script.id if sample_script is not None else None),
+        'sample_thread_id': (sample_thread.id if sample_thread is not None else None),
+        'sample_comment_id': (sample_comment.id if sample_comment is not None else None),
+        'sample_username': all_users[0].username,
+        'sample_password': PASSWORD,
+        'sample_keyword': WORDS[0],
+    }
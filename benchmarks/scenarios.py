@@ -0,0 +1,142 @@
+import statistics
+import time
+
+from installies.app import app
+from installies.models.user import User, Session
+
+
+class Scenario:
+    """
+    A request to benchmark.
+
+    :param name: The name of the scenario.
+    :param path: The path to request.
+    :param method: The request method.
+    :param data: The form data to send.
+    :param authenticated: If true, the request is sent with a logged in user's session cookie.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            path: str,
+            method: str='GET',
+            data: dict=None,
+            authenticated: bool=False,
+    ):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.authenticated = authenticated
+
+
+def get_scenarios(catalog: dict) -> list[Scenario]:
+    """
+    Gets the scenarios to benchmark against a generated catalog.
+
+    :param catalog: The dict returned by ``generate_catalog``.
+    """
+    app_name = catalog['sample_app']
+    script_id = catalog['sample_script_id']
+    keyword = catalog['sample_keyword']
+
+    return [
+        Scenario('index', '/'),
+        Scenario('index_authenticated', '/', authenticated=True),
+        Scenario('apps_search', f'/apps?k={keyword}'),
+        Scenario('apps_search_description', f'/apps?k={keyword}&search-in=name,description'),
+        Scenario('scripts_distro', '/scripts?distro=debian'),
+        Scenario('scripts_distro_arch', '/scripts?distro=arch&arch=x86_64&per-page=50'),
+        Scenario('api_apps', '/api/apps?per-page=50'),
+        Scenario('api_apps_search', f'/api/apps?k={keyword}&per-page=50'),
+        Scenario('api_scripts', f'/api/apps/{app_name}/scripts?per-page=50'),
+        Scenario('script_list', f'/apps/{app_name}/scripts'),
+        Scenario('script_detail', f'/apps/{app_name}/scripts/{script_id}'),
+        Scenario('script_download', f'/apps/{app_name}/scripts/{script_id}/download'),
+        Scenario(
+            'login',
+            '/login',
+            method='POST',
+            data={
+                'username': catalog['sample_username'],
+                'password': catalog['sample_password'],
+            },
+        ),
+    ]
+
+
+def run_scenario(scenario: Scenario, repeat: int, warmup: int, session_token: str) -> dict:
+    """
+    Runs a scenario, and returns a dict with its timings.
+
+    :param scenario: The scenario to run.
+    :param repeat: The amount of timed requests.
+    :param warmup: The amount of untimed requests to send first.
+    :param session_token: The session token for authenticated scenarios.
+    """
+    timings = []
+    query_counts = []
+    status_codes = set()
+    response_size = 0
+
+    for i in range(warmup + repeat):
+        # a new client is used each time, so cookies from responses like
+        # the login one are not sent with the next request.
+        client = app.test_client()
+        if scenario.authenticated:
+            client.set_cookie('user-token', session_token)
+
+        start = time.perf_counter()
+        response = client.open(scenario.path, method=scenario.method, data=scenario.data)
+        body = response.get_data()
+        duration = time.perf_counter() - start
+
+        if i < warmup:
+            continue
+
+        timings.append(duration * 1000)
+        status_codes.add(response.status_code)
+        response_size = len(body)
+
+        query_count = response.headers.get('X-Query-Count')
+        if query_count is not None:
+            query_counts.append(int(query_count))
+
+    timings.sort()
+
+    return {
+        'path': scenario.path,
+        'method': scenario.method,
+        'status_codes': sorted(status_codes),
+        'runs': repeat,
+        'mean_ms': statistics.mean(timings),
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+        'max_ms': timings[-1],
+        'queries': (max(query_counts) if query_counts != [] else None),
+        'response_bytes': response_size,
+    }
+
+
+def run_scenarios(catalog: dict, repeat: int=20, warmup: int=2, only: list[str]=None) -> dict:
+    """
+    Runs all the scenarios, and returns a dict of their results by name.
+
+    :param catalog: The dict returned by ``generate_catalog``.
+    :param repeat: The amount of timed requests for each scenario.
+    :param warmup: The amount of untimed requests to send first.
+    :param only: The names of the scenarios to run. If None, all are run.
+    """
+    user = User.get(User.username == catalog['sample_username'])
+    session_token = Session.create(user=user).token
+
+    results = {}
+    for scenario in get_scenarios(catalog):
+        if only is not None and scenario.name not in only:
+            continue
+
+        results[scenario.name] = run_scenario(scenario, repeat, warmup, session_token)
+
+    return results
@@ -13,6 +13,7 @@ setup(
         'installies.static',
         'installies.templates',
         'installies.lib',
+        'installies.storage',
         'installies.models',
         'installies.groups',
         'installies.validators',
@@ -3,16 +3,51 @@ from installies.blueprints.app_library.views import app_library
 from installies.blueprints.app_manager.blueprint import app_manager
 from installies.blueprints.auth.views import auth
 from installies.blueprints.admin.blueprint import admin
-from installies.config import database, host, port, protocol
+from installies.config import database, host, port, protocol, query_stats_headers
 from installies.models.user import User, Session
 from installies.lib.dict import remove_value_from_dictionary, join_dictionaries
 from installies.lib.url import get_base_url
 from installies.lib.shell import Shell
+from installies.lib.view import is_db_free_request
 from installies import __version__
 from flask import Flask, request, g, render_template
+from flask.ctx import _AppCtxGlobals
 from peewee import *
 
+import logging
+
+request_logger = logging.getLogger('installies.requests')
+
+
+class RequestGlobals(_AppCtxGlobals):
+    """
+    The ``g`` object for requests.
+
+    The user is looked up the first time ``g.user`` or ``g.is_authed`` is
+    accessed, so routes that never use them do not query the session.
+    """
+
+    @property
+    def user(self):
+        if '_user' not in self.__dict__:
+            self._user = None
+
+            token = request.cookies.get('user-token')
+            if token is not None:
+                self._user = Session.get_user_by_token(
+                    token,
+                    cache_only=is_db_free_request(),
+                )
+
+        return self._user
+
+    @property
+    def is_authed(self):
+        return self.user is not None
+
+
 app = Flask(__name__)
+app.app_ctx_globals_class = RequestGlobals
 
 app.jinja_env.trim_blocks = True
 app.jinja_env.lstrip_blocks = True
@@ -20,27 +55,46 @@ app.secret_key = '(j*&J6HtfJ$&hg&^__gEj'
 
 @app.before_request
 def before_request():
-    database.connect()
+    database.start_query_stats(request.endpoint)
 
-    g.is_authed = False
-    g.user = None
+    if is_db_free_request() is False:
+        database.connect(reuse_if_open=True)
 
-    token = request.cookies.get('user-token')
 
-    if token is not None:
-        session = Session.select().where(Session.token == token)
+@app.after_request
+def after_request(response):
+    stats = database.get_query_stats()
 
-        if session.exists():
-            session = session.get()
-            
-            g.is_authed = True
-            g.user = session.user
+    if stats is None:
+        return response
 
+    if query_stats_headers:
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"'
+        )
+
+    request_logger.info(
+        '%s %s %s: %s queries in %.2fms',
+        request.method,
+        request.path,
+        response.status_code,
+        stats.count,
+        stats.total_time * 1000,
+        extra=stats.serialize() | {'endpoint': request.endpoint},
+    )
 
-@app.after_request
-def after_request(response):
-    database.close()
     return response
+
+
+@app.teardown_request
+def teardown_request(exception):
+    # teardown runs even when the request raised, so pooled connections are
+    # always given back.
+    if database.is_closed() is False:
+        database.close()
+
+    database.stop_query_stats()
     
 @app.errorhandler(404)
 def pagenotfound(e):
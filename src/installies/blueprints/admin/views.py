@@ -3,6 +3,7 @@ from installies.models.user import User
 from installies.models.app import App
 from installies.models.script import Script
 from installies.models.discussion import Thread, Comment
+from installies.config import database, database_pooled
 from installies.lib.view import (
     AuthenticationRequiredMixin,
     TemplateView,
@@ -30,5 +31,8 @@ class AdminOptions(AuthenticationRequiredMixin, AdminRequiredMixin, TemplateView
         kwargs['script_count'] = Script.select().count()
         kwargs['thread_count'] = Thread.select().count()
         kwargs['comment_count'] = Comment.select().count()
+
+        if database_pooled:
+            kwargs['pool_stats'] = database.stats()
         
         return kwargs
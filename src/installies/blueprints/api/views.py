@@ -1,22 +1,104 @@
-from flask import Blueprint, abort, request, g
+from flask import Blueprint, abort, request, g, make_response
 from installies.groups.app import AppGroup
 from installies.groups.script import ScriptGroup
 from installies.groups.modifiers import Paginate
 from installies.models.app import App
 from installies.models.script import Script
+from installies.lib.view import make_etag, is_not_modified, not_modified, set_validators
+from installies.lib.cache import TTLCache
 from peewee import *
 
+import gzip
 import json
 import re
 
 api = Blueprint('api', __name__)
 
+# compressed responses by their ETag. The ETag changes when the data does, so
+# each version of a response is only compressed once.
+compressed_responses = TTLCache(max_size=256, ttl=3600)
+
+# responses smaller than this are not worth compressing
+MIN_COMPRESSED_SIZE = 1024
+
+
+def accepts_gzip() -> bool:
+    """Checks if the client accepts gzip compressed responses."""
+    return request.accept_encodings['gzip'] > 0
+
+
+def get_stored_response(etag: str):
+    """
+    Gets a response without serializing anything, or None if it has to be made.
+
+    A 304 response is returned if the client already has the response, either
+    compressed or not. If the client accepts gzip, and the response was
+    compressed before, the compressed response is returned.
+
+    :param etag: The ETag of the response.
+    """
+    # the compressed response is a different representation, so it has its own ETag
+    compressed_etag = f'{etag}-gzip'
+
+    if is_not_modified(etag):
+        return not_modified(etag, vary=['Accept-Encoding'])
+
+    if accepts_gzip() is False:
+        return None
+
+    if is_not_modified(compressed_etag):
+        return not_modified(compressed_etag, vary=['Accept-Encoding'])
+
+    compressed_body = compressed_responses.get(etag)
+    if compressed_body is None:
+        return None
+
+    return make_compressed_response(compressed_body, compressed_etag)
+
+
+def make_compressed_response(compressed_body: bytes, etag: str):
+    """
+    Makes a response with a gzip compressed json body.
+
+    :param compressed_body: The compressed body.
+    :param etag: The ETag of the response.
+    """
+    response = make_response(compressed_body)
+    response.mimetype = 'application/json'
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return set_validators(response, etag)
+
+
+def make_api_response(data: dict, etag: str):
+    """
+    Makes a response from the data.
+
+    The response is compressed if the client accepts gzip, and it is big enough.
+
+    :param data: The data to put in the response.
+    :param etag: The ETag of the response.
+    """
+    response = make_response(data)
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if accepts_gzip() is False or len(body) < MIN_COMPRESSED_SIZE:
+        return set_validators(response, etag)
+
+    compressed_body = gzip.compress(body, mtime=0)
+    compressed_responses.set(etag, compressed_body)
+
+    return make_compressed_response(compressed_body, f'{etag}-gzip')
+
+
 @api.route('/api/apps')
 def apps():
-    apps = AppGroup().get(params=request.args)
+    apps, params, similar_names = AppGroup.get_or_similar(request.args)
 
     data = {
-        'apps': []
+        'apps': [],
+        'similar_names': similar_names,
     }
 
     paginator = Paginate(
@@ -24,12 +106,38 @@ def apps():
          max_per_page = 50,
      )
 
-    apps = paginator.modify(apps, params=request.args)
+    apps = list(paginator.modify(apps, params=params))
+
+    # the ETag is checked before anything is serialized. Last-Modified is not
+    # used, since removing an object from the list does not make it newer.
+    etag = make_etag(
+        request.query_string.decode('utf8'),
+        [(app.id, app.last_modified) for app in apps],
+    )
+    stored_response = get_stored_response(etag)
+    if stored_response is not None:
+        return stored_response
 
-    for app in apps:
+    for app in AppGroup.prefetch(apps):
         data['apps'].append(app.serialize())
 
-    return data
+    return make_api_response(data, etag)
+
+@api.route('/api/apps/suggest')
+def suggest_apps():
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    apps = App.suggest(request.args.get('q', ''), limit)
+
+    return {
+        'apps': [
+            {'name': app.name, 'display_name': app.display_name}
+            for app in apps
+        ]
+    }
 
 @api.route('/api/apps/<app_name>/scripts')
 def scripts(app_name):
@@ -50,14 +158,41 @@ def scripts(app_name):
         max_per_page = 50,
     )
 
-    scripts = paginator.modify(scripts, params=request.args)
+    scripts = list(paginator.modify(scripts, params=request.args))
+
+    # the facets count scripts that are not on the page, so they are part of the ETag
+    facets = None
+    if request.args.get('include-facets', 'no') == 'yes':
+        facets = ScriptGroup.get_facets(
+            request.args,
+            query=Script.select().where(Script.app == app),
+        )
+
+    # the ETag is checked before anything is serialized. Last-Modified is not
+    # used, since removing an object from the list does not make it newer.
+    etag = make_etag(
+        request.query_string.decode('utf8'),
+        [(script.id, script.last_modified, script.artifact_hash) for script in scripts],
+        facets,
+    )
+    stored_response = get_stored_response(etag)
+    if stored_response is not None:
+        return stored_response
 
     data = {
         'scripts': []
     }
 
-    for script in scripts:
-        serialized_script = script.serialize()
+    include_content = (request.args.get('include-content', 'yes') != 'no')
+
+    for script in ScriptGroup.prefetch(scripts):
+        serialized_script = script.serialize(include_content=include_content)
         data['scripts'].append(serialized_script)
 
-    return data
+    if facets is not None:
+        data['facets'] = {
+            name: [{'value': value, 'count': count} for value, count in values]
+            for name, values in facets.items()
+        }
+
+    return make_api_response(data, etag)
@@ -1,5 +1,5 @@
 from flask import render_template, Blueprint, request, g, Response
-from installies.lib.view import TemplateView
+from installies.lib.view import TemplateView, db_free
 from installies.groups.app import AppGroup
 from installies.groups.script import ScriptGroup
 from installies.groups.modifiers import Paginate
@@ -18,21 +18,20 @@ class IndexView(TemplateView):
 
     def get_context_data(self, **kwargs):
         if g.is_authed:
-            user_maintained_apps = (
+            user_maintained_apps = AppGroup.prefetch(
                 AppGroup
-                .get({'search-in': 'maintainers', 'k': g.user.username})
+                .get({'maintained-by': g.user.username})
                 .paginate(1, 10)
             )
-            user_maintained_scripts = (
+            user_maintained_scripts = ScriptGroup.prefetch(
                  ScriptGroup
-                .get(
-                    {'search-in': 'maintainers', 'k': g.user.username})
+                .get({'maintained-by': g.user.username})
                 .paginate(1, 10)
             )
             kwargs['user_maintained_apps'] = user_maintained_apps
             kwargs['user_maintained_scripts'] = user_maintained_scripts
 
-        recently_updated_apps = (
+        recently_updated_apps = AppGroup.prefetch(
             AppGroup
             .get({
                 'sort-by': 'last_modified',
@@ -42,7 +41,7 @@ class IndexView(TemplateView):
         )
         kwargs['recently_updated_apps'] = recently_updated_apps
 
-        newest_apps = (
+        newest_apps = AppGroup.prefetch(
             AppGroup
             .get({
                 'sort-by': 'creation_date',
@@ -58,14 +57,14 @@ app_library.add_url_rule('/', 'index', view_func=IndexView.as_view())
     
 @app_library.route('/apps')
 def apps():
-    apps = AppGroup.get(request.args)
+    apps, params, similar_names = AppGroup.get_or_similar(request.args)
 
     paginator = Paginate(
         default_per_page = 10,
         max_per_page = 50,
     )
 
-    paginated_apps = paginator.modify(apps, request.args)
+    paginated_apps = paginator.modify(apps, params)
     
     total_app_count = apps.count()
     try:
@@ -77,9 +76,10 @@ def apps():
 
     return render_template(
         'apps.html',
-        apps=paginated_apps,
+        apps=AppGroup.prefetch(paginated_apps),
         total_app_count=total_app_count,
         page_count=page_count,
+        similar_names=similar_names,
     )
 
 
@@ -107,10 +107,12 @@ def scripts():
     return render_template(
         'scripts.html',
         page_count=page_count,
-        scripts=paginated_scripts,
+        scripts=ScriptGroup.prefetch(paginated_scripts),
+        facets=ScriptGroup.get_facets(request.args),
     )
 
 
 @app_library.route('/support')
+@db_free
 def support():
     return render_template('support.html')
@@ -55,13 +55,11 @@ class AppMixin:
         if app_name is None:
             abort(404)
 
-        app = App.select().where(App.name == app_name)
+        app = App.get_or_none(App.name == app_name)
 
-        if app.exists() is False:
+        if app is None:
             abort(404)
 
-        app = app.get()
-
         if app.can_user_edit(g.user) is False and self.maintainer_only:
             flash(
                 'You do not have permission to do that.',
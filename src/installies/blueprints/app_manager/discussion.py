@@ -38,7 +38,7 @@ from installies.lib.view import (
     ListView,
     DetailView,
 )
-from peewee import JOIN
+from peewee import JOIN, fn
 from installies.blueprints.admin.views import AdminRequiredMixin
 from installies.groups.modifiers import Paginate
 from installies.blueprints.app_manager.app import (
@@ -219,7 +219,12 @@ class CommentListView(AppMixin, ThreadMixin, ListView):
     )
 
     def get_group(self, **kwargs):
-        return kwargs['thread'].comments
+        # the creators are joined, so the comments do not query them one by one
+        return (
+            kwargs['thread'].comments
+            .select(Comment, User)
+            .join(User)
+        )
 
 
 class ThreadListView(AppMixin, ListView):
@@ -233,7 +238,16 @@ class ThreadListView(AppMixin, ListView):
     )
 
     def get_group(self, **kwargs):
+        # the creators and comment counts are loaded with the threads, instead of for each one
+        comment_count = (
+            Comment
+            .select(fn.COUNT(Comment.id))
+            .where(Comment.thread == Thread.id)
+        )
+
         return (
-            Thread.select()
+            Thread
+            .select(Thread, User, comment_count.alias('comment_count'))
+            .join(User, JOIN.LEFT_OUTER)
             .where(Thread.app == kwargs['app'])
         )
@@ -3,7 +3,6 @@ import json
 import os
 import re
 import math
-import io
 
 from flask import (
     Blueprint,
@@ -14,7 +13,7 @@ from flask import (
     abort,
     flash,
     url_for,
-    send_file,
+    session,
 )
 from installies.validators.base import ValidationError
 from installies.validators.script import (
@@ -25,7 +24,7 @@ from installies.validators.script import (
 from installies.groups.script import ScriptGroup
 from installies.models.app import App
 from installies.models.maintainer import Maintainer, Maintainers
-from installies.models.script import Script
+from installies.models.script import Script, ScriptBlob, ScriptRevision
 from installies.models.user import User
 from installies.forms.script import (
     CreateScriptForm,
@@ -38,6 +37,8 @@ from installies.lib.view import (
     TemplateView,
     ListView,
     DetailView,
+    ConditionalMixin,
+    make_etag,
 )
 from peewee import JOIN, DoesNotExist
 from installies.blueprints.admin.views import AdminRequiredMixin
@@ -46,6 +47,8 @@ from installies.blueprints.app_manager.app import (
     AppMixin,
 )
 from installies.lib.shell import Shell
+from installies.lib.download import send_download, send_download_stream
+from installies.storage import storage
 
 class ScriptMixin:
     """
@@ -56,20 +59,28 @@ class ScriptMixin:
 
     script_maintainer_only = False
 
+    # if false, the script's maintainers and actions are not loaded, for views that do not use them
+    prefetch_relations = True
+
     def on_request(self, **kwargs):
         script_id = kwargs['script_id']
 
-        script = Script.select().where(Script.id == script_id)
+        script = Script.get_or_none(Script.id == script_id)
 
-        if script.exists() is False:
+        if script is None or script.app_id != kwargs['app'].id:
             abort(404)
 
-        script = script.get()
+        script.app = kwargs['app']
 
-        if kwargs['app'] != script.app:
-            abort(404)
+        # the script's pages show its app, maintainers, and actions more than once, so they are
+        # loaded once here. The app's maintainers are loaded too, for checking if the user can edit it.
+        if self.prefetch_relations:
+            maintainers = Maintainers.prefetch({script.maintainers_id, script.app.maintainers_id})
+            script.maintainers = maintainers[script.maintainers_id]
+            script.app.maintainers = maintainers[script.app.maintainers_id]
+            script.actions = list(script.actions)
 
-        if script.can_user_edit(g.user) is False and self.script_maintainer_only:
+        if self.script_maintainer_only and script.can_user_edit(g.user) is False:
             flash(
                 'You do not have permission to do that.',
                 'error'
@@ -100,44 +111,178 @@ class ScriptListView(AppMixin, ListView):
     )
 
 
+    def get_query(self, **kwargs):
+        """Gets the query of the app's scripts, before they are filtered."""
+        return Script.select().where(Script.app == kwargs['app'])
+
     def get_group(self, **kwargs):
         group = ScriptGroup.get(
             request.args,
-            query=(
-                Script
-                .select()
-                .where(Script.app == kwargs['app'])
-            )
+            query=self.get_query(**kwargs),
         )
         
         return group
 
+    def get_context_data(self, **kwargs):
+        # the page's scripts are loaded with their relations, so the cards do not query each one
+        kwargs['scripts'] = ScriptGroup.prefetch(kwargs['scripts'])
+        kwargs['facets'] = ScriptGroup.get_facets(request.args, query=self.get_query(**kwargs))
+        return super().get_context_data(**kwargs)
+
 
-class ScriptDetailView(AppMixin, ScriptMixin, DetailView):
+class ScriptDetailView(AppMixin, ScriptMixin, ConditionalMixin, DetailView):
     """A view for getting the details of a script."""
 
     template_path = 'script/info.html'
     model_name = 'script'
 
+    def get_etag(self, **kwargs):
+        # showing messages removes them, so pages with messages are always sent
+        if session.get('_flashes'):
+            return None
+
+        script = kwargs['script']
+
+        # the page also shows the maintainers and latest comments, and options for the user,
+        # which can change without the script changing. They are loaded here, and used to
+        # render the page, so a 304 never reads the script's content or renders the page.
+        return make_etag(
+            script.id,
+            script.last_modified,
+            script.artifact_hash,
+            script.app.last_modified,
+            ((g.user.id, g.user.admin) if g.user is not None else None),
+            [
+                (group.id, [maintainer.user_id for maintainer in group.maintainers])
+                for group in [script.maintainers, script.app.maintainers]
+            ],
+            [(comment.id, comment.content) for comment in script.get_latest_comments()],
+        )
+
     def get_object(self, **kwargs):
         return kwargs['script']
 
 
-class ScriptDownloadView(AppMixin, ScriptMixin, View):
+
+class ScriptDownloadView(AppMixin, ScriptMixin, ConditionalMixin, View):
     """A view for getting the content of scripts."""
 
+    # the ETag depends on whether the compressed copy is sent
+    vary = ['Accept-Encoding']
+
+    # downloads do not use the script's maintainers or actions, so 304s only load the script
+    prefetch_relations = False
+
+    def accepts_gzip(self) -> bool:
+        """Checks if the client accepts gzip."""
+        return request.accept_encodings['gzip'] > 0
+
+    def get_etag(self, **kwargs):
+        script = kwargs['script']
+
+        if script.artifact_hash is None:
+            return make_etag(script.id, script.last_modified)
+
+        # the ETag is made from the script's row, so a 304 never reads the storage. The
+        # compressed copy is a different representation, so clients that accept it get
+        # their own ETag.
+        if self.accepts_gzip():
+            return f'{script.artifact_hash}-gzip'
+
+        return script.artifact_hash
+
+    def get_last_modified(self, **kwargs):
+        return kwargs['script'].last_modified
+
     def get(self, **kwargs):
         script = kwargs['script']
-        content = script.complete_content()
-        script_file = io.BytesIO(content.encode('utf-8'))
         shell = Shell.get_shell_by_name(script.shell)
-        return send_file(
-            script_file,
-            mimetype=shell.file_mimetype,
-            download_name=f'{script.app.name}.{shell.file_extension}',
-            as_attachment=True
+        download_kwargs = {
+            'mimetype': shell.file_mimetype,
+            'download_name': f'{script.app.name}.{shell.file_extension}',
+            'last_modified': script.last_modified,
+        }
+
+        if script.artifact_hash is None:
+            # scripts that have not been migrated do not have an artifact yet
+            data = script.complete_content().encode('utf-8')
+            response = send_download_stream([data], len(data), **download_kwargs)
+        else:
+            # artifacts built before they were compressed do not have a compressed copy
+            compressed = (self.accepts_gzip() and script.has_compressed_artifact)
+            content_encoding = ('gzip' if compressed else None)
+            key = ScriptBlob.get_key(script.artifact_hash, compressed)
+            path = storage.get_path(key)
+
+            if path is not None:
+                response = send_download(path, content_encoding=content_encoding, **download_kwargs)
+            else:
+                # artifacts that are not in their own file are streamed from the storage
+                response = send_download_stream(
+                    storage.stream(key),
+                    storage.stat(key).size,
+                    content_encoding=content_encoding,
+                    **download_kwargs,
+                )
+
+        return response
+
+
+class ScriptHistoryView(AppMixin, ScriptMixin, TemplateView):
+    """A view for listing the revisions of a script."""
+
+    template_path = 'script/history.html'
+
+    def get_context_data(self, **kwargs):
+        # the revisions' data is not needed for the list, so it is not loaded
+        kwargs['revisions'] = (
+            ScriptRevision
+            .select(
+                ScriptRevision.id,
+                ScriptRevision.number,
+                ScriptRevision.creation_date,
+                ScriptRevision.size,
+                ScriptRevision.editor,
+                User,
+            )
+            .join(User, JOIN.LEFT_OUTER)
+            .where(ScriptRevision.script == kwargs['script'])
+            .order_by(ScriptRevision.number.desc())
         )
-    
+
+        return kwargs
+
+
+class ScriptRevisionView(AppMixin, ScriptMixin, TemplateView):
+    """
+    A view for showing what a revision of a script changed.
+
+    The revision is compared with the one before it, or the one in the ``compare`` url param.
+    """
+
+    template_path = 'script/revision.html'
+
+    def get_context_data(self, **kwargs):
+        revision = ScriptRevision.get_or_none(
+            (ScriptRevision.script == kwargs['script']) &
+            (ScriptRevision.number == kwargs['revision_number'])
+        )
+
+        if revision is None:
+            abort(404)
+
+        compare_number = request.args.get('compare', revision.number - 1, type=int)
+        compared_revision = ScriptRevision.get_or_none(
+            (ScriptRevision.script == kwargs['script']) &
+            (ScriptRevision.number == compare_number)
+        )
+
+        kwargs['revision'] = revision
+        kwargs['compared_revision'] = compared_revision
+        kwargs['diff'] = revision.get_diff(compared_revision)
+
+        return kwargs
+
 
 class AddScriptFormView(AuthenticationRequiredMixin, AppMixin, FormView):
     """A view for adding apps."""
@@ -1,13 +1,22 @@
 import os
 import configparser
 
-from peewee import MySQLDatabase
 from pathlib import Path
+from installies.database.instrument import (
+    InstrumentedMySQLDatabase,
+    InstrumentedPooledMySQLDatabase,
+    InstrumentedSqliteDatabase,
+    InstrumentedPooledSqliteDatabase,
+)
 
 os.environ['TZ'] = 'UTC'
 
+# the config file can be changed with the INSTALLIES_CONFIG environment
+# variable, this is used by the benchmarks.
+config_path = os.environ.get('INSTALLIES_CONFIG', '/etc/installies/config.ini')
+
 config = configparser.ConfigParser()
-config.read('/etc/installies/config.ini')
+config.read(config_path)
 
 # server config
 server_config = config['server']
@@ -17,16 +26,73 @@ port = int(server_config['Port'])
 protocol = server_config['Protocol']
 hostname = server_config.get('Hostname', None)
 debug_mode = (True if server_config['DebugMode'] == 'yes' else False)
+session_cache_size = int(server_config.get('SessionCacheSize', 10000))
+# each process has its own session cache, so a logged out or banned session can
+# still be used in other processes for this many seconds.
+session_cache_ttl = int(server_config.get('SessionCacheTTL', 5))
+query_stats_headers = (True if server_config.get('QueryStatsHeaders', 'no') == 'yes' else False)
+
+# the seconds between updates of the app name suggestions with the apps
+# changed by other processes.
+suggest_refresh_interval = int(server_config.get('SuggestRefreshInterval', 60))
+
+# the header used to let the reverse proxy send script downloads, can be
+# "none", "x-sendfile" for apache, or "x-accel-redirect" for nginx.
+sendfile_header = server_config.get('SendfileHeader', 'none')
+sendfile_prefix = server_config.get('SendfilePrefix', '/protected-scripts')
 
 # config related to database
 database_config = config['database']
 
-database = MySQLDatabase(
+# the database can be "mysql", or "sqlite" for local development and benchmarks
+database_engine = database_config.get('Engine', 'mysql')
+
+if database_engine == 'sqlite':
+    database_connect_kwargs = {
+        'pragmas': {'foreign_keys': 1, 'journal_mode': 'wal'},
+    }
+else:
+    database_connect_kwargs = {
+        'user': database_config['User'],
+        'password': database_config['Passwd'],
+        'host': database_config['Host'],
+        'port': int(database_config['Port']),
+    }
+
+# config related to the database connection pool
+database_pooled = (True if database_config.get('Pooled', 'no') == 'yes' else False)
+database_max_connections = int(database_config.get('MaxConnections', 20))
+database_stale_timeout = int(database_config.get('StaleTimeout', 300))
+database_recycle_age = int(database_config.get('RecycleAge', 3600))
+database_wait_timeout = int(database_config.get('WaitTimeout', 10))
+
+if database_pooled:
+    database_connect_kwargs = database_connect_kwargs | {
+        'max_connections': database_max_connections,
+        'stale_timeout': database_stale_timeout,
+        'recycle_age': database_recycle_age,
+        'timeout': database_wait_timeout,
+    }
+
+# if yes, keyword searches use full-text indexes and are ranked by relevance,
+# instead of LIKE. The indexes are made by the migration command, so it has to be
+# run after this is turned on.
+full_text_search = (True if database_config.get('FullTextSearch', 'no') == 'yes' else False)
+
+# the milliseconds a query has to take to be logged as slow, 0 disables the log
+slow_query_threshold = int(database_config.get('SlowQueryThreshold', 0))
+
+database_classes = {
+    ('mysql', False): InstrumentedMySQLDatabase,
+    ('mysql', True): InstrumentedPooledMySQLDatabase,
+    ('sqlite', False): InstrumentedSqliteDatabase,
+    ('sqlite', True): InstrumentedPooledSqliteDatabase,
+}
+
+database = database_classes[(database_engine, database_pooled)](
     database_config['Name'],
-    user=database_config['User'],
-    password=database_config['Passwd'],
-    host=database_config['Host'],
-    port=int(database_config['Port'])
+    slow_query_threshold=slow_query_threshold / 1000,
+    **database_connect_kwargs
 )
 
 # config related to scripts
@@ -35,6 +101,17 @@ script_config = config['script']
 apps_path = script_config['UploadPath']
 max_script_length = int(script_config['MaxLength'])
 
+# where script files are stored, "files" for a file for each blob, "pack"
+# to append them to segment files that are PackSegmentSize megabytes, or
+# "memory" to only keep them in memory, for benchmarks and tests.
+script_storage = script_config.get('Storage', 'files')
+pack_segment_size = int(script_config.get('PackSegmentSize', 64)) * 1024 * 1024
+
+# when script files and their folders are synced to disk, can be "none", "always", or
+# "interval" to sync them together every FsyncInterval milliseconds.
+fsync_policy = script_config.get('FsyncPolicy', 'none')
+fsync_interval = int(script_config.get('FsyncInterval', 100))
+
 
 # config related to email
 email_config = config['email']
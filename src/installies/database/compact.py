@@ -0,0 +1,51 @@
+import argparse
+import time
+
+from installies.config import database, script_storage
+from installies.models.script import ScriptBlob
+from installies.storage import storage
+
+
+def compact(min_dead_ratio: float):
+    """
+    Deletes the content no scripts use, compacts the pack files, and prints how much was reclaimed.
+
+    :param min_dead_ratio: The part of a segment that has to be deleted data to compact it.
+    """
+    # no transaction is held, so each blob and segment is committed before its data is removed
+    with database.connection_context():
+        collected = ScriptBlob.collect()
+        print(f'Deleted {collected} unused blobs.')
+
+        if script_storage == 'pack':
+            reclaimed = storage.compact(min_dead_ratio)
+            print(f'Reclaimed {reclaimed} bytes.')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m installies.database.compact',
+        description='Deletes the content of deleted scripts, and reclaims their space in the pack files.',
+    )
+    parser.add_argument(
+        '--min-dead-ratio',
+        type=float,
+        default=0.5,
+        help='The part of a pack file that has to be deleted scripts to compact it.',
+    )
+    parser.add_argument(
+        '--every',
+        type=float,
+        help='Keep running in the background, and compact every this many seconds.',
+    )
+    args = parser.parse_args()
+
+    compact(args.min_dead_ratio)
+
+    while args.every is not None:
+        time.sleep(args.every)
+        compact(args.min_dead_ratio)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,24 @@
 from installies.config import database
 from installies.models.app import App
-from installies.models.script import Script, Action
+from installies.models.script import Script, ScriptBlob, ScriptRevision, Action
 from installies.models.supported_distros import SupportedDistro
 from installies.models.user import User, Session, Ban, PasswordResetRequest
 from installies.models.report import Report, ReportAppInfo, ReportScriptInfo, ReportCommentInfo
 from installies.models.discussion import Thread, Comment
 from installies.models.maintainer import Maintainers, Maintainer
+from installies.models.pack import PackEntry
+from installies.database.search import full_text_indexes
 
 tables =  [
     User,
     Session,
     App,
+    ScriptBlob,
     Script,
     Ban,
     PasswordResetRequest,
     Action,
+    ScriptRevision,
     SupportedDistro,
     Maintainer,
     Maintainers,
@@ -24,6 +28,7 @@ tables =  [
     ReportCommentInfo,
     Thread,
     Comment,
+    PackEntry,
 ]
 
 def create_database():
@@ -31,10 +36,16 @@ def create_database():
     with database:
         database.create_tables(tables)
 
+        for index in full_text_indexes:
+            index.create()
+
 
 def drop_database():
     """Drop tables in database."""
     with database:
+        for index in full_text_indexes:
+            index.drop()
+
         database.drop_tables(tables)
 
 
@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from peewee import MySQLDatabase, SqliteDatabase
+from installies.database.pool import PooledMySQLDatabase, PooledSqliteDatabase
+
+slow_query_logger = logging.getLogger('installies.slow_queries')
+
+# matches lists of placeholders like "(%s, %s, %s)", so IN clauses of
+# different lengths have the same shape.
+placeholder_list_pattern = re.compile(r'\(\s*(%s|\?)(\s*,\s*(%s|\?))+\s*\)')
+
+
+class QueryStats:
+    """A class for storing the count and timing of the queries run during a request."""
+
+    def __init__(self, endpoint: str=None):
+        self.endpoint = endpoint
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+
+    def record(self, sql: str, duration: float):
+        """
+        Adds a query to the stats.
+
+        :param sql: The sql of the query.
+        :param duration: The seconds the query took to run.
+        """
+        self.count += 1
+        self.total_time += duration
+
+        if self.slowest_sql is None or duration > self.slowest_time:
+            self.slowest_sql = sql
+            self.slowest_time = duration
+
+    def serialize(self):
+        """Turns the stats into a json serializable dict."""
+        data = {}
+
+        data['query_count'] = self.count
+        data['query_time'] = self.total_time
+        data['slowest_query'] = self.slowest_sql
+        data['slowest_query_time'] = self.slowest_time
+
+        return data
+
+
+def get_query_shape(sql: str) -> str:
+    """
+    Gets the shape of a query's sql, so queries that only differ by their params match.
+
+    :param sql: The sql of the query.
+    """
+    shape = placeholder_list_pattern.sub(r'(\1, ...)', sql)
+    return ' '.join(shape.split())
+
+
+class QueryStatsMixin:
+    """
+    A mixin for peewee databases that records stats about the queries run in a request.
+
+    Stats are only recorded between ``start_query_stats`` and ``stop_query_stats``. They
+    are kept per thread, so each request gets its own stats.
+
+    Queries slower than the slow query threshold are logged to the
+    ``installies.slow_queries`` logger. The first time a query shape is slow, its
+    ``EXPLAIN`` plan is captured and logged with it.
+
+    :param slow_query_threshold: The seconds a query has to take to be logged as slow. If
+        it is 0, slow queries are not logged.
+    :param max_explained_shapes: The max amount of query shapes to keep plans for.
+    """
+
+    explain_prefix = 'EXPLAIN'
+
+    def __init__(self, *args, slow_query_threshold: float=0, max_explained_shapes: int=1000, **kwargs):
+        self._query_stats = threading.local()
+
+        self.slow_query_threshold = slow_query_threshold
+        self.max_explained_shapes = max_explained_shapes
+        self.explained_shapes = {}
+        self._explain_lock = threading.Lock()
+
+        super().__init__(*args, **kwargs)
+
+    def start_query_stats(self, endpoint: str=None) -> QueryStats:
+        """
+        Starts recording query stats for the current thread, and returns the stats.
+
+        :param endpoint: The endpoint of the request the queries are for.
+        """
+        stats = QueryStats(endpoint)
+        self._query_stats.value = stats
+        return stats
+
+    def stop_query_stats(self):
+        """Stops recording query stats for the current thread, and returns the stats."""
+        stats = self.get_query_stats()
+        self._query_stats.value = None
+        return stats
+
+    def get_query_stats(self):
+        """Gets the query stats for the current thread. None is returned if they are not being recorded."""
+        return getattr(self._query_stats, 'value', None)
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+
+            stats = self.get_query_stats()
+            if stats is not None:
+                stats.record(sql, duration)
+
+            if self.slow_query_threshold and duration > self.slow_query_threshold:
+                self.log_slow_query(sql, params, duration, stats)
+
+    def explain(self, sql: str, params=None):
+        """
+        Gets the plan of a query, in a list of rows.
+
+        :param sql: The sql of the query.
+        :param params: The params of the query.
+        """
+        cursor = super().execute_sql(f'{self.explain_prefix} {sql}', params)
+        return [list(row) for row in cursor.fetchall()]
+
+    def get_plan_for_shape(self, shape: str, sql: str, params=None):
+        """
+        Gets the plan of a query shape the first time it is seen. None is returned after that.
+
+        Only SELECT queries are explained.
+
+        :param shape: The shape of the query.
+        :param sql: The sql of the query.
+        :param params: The params of the query.
+        """
+        with self._explain_lock:
+            if shape in self.explained_shapes:
+                return None
+
+            if len(self.explained_shapes) >= self.max_explained_shapes:
+                return None
+
+            # marks the shape as explained before running the explain, so
+            # other threads do not explain it at the same time.
+            self.explained_shapes[shape] = None
+
+        if sql.lstrip().upper().startswith('SELECT') is False:
+            return None
+
+        try:
+            plan = self.explain(sql, params)
+        except Exception as e:
+            plan = f'Could not explain query: {e}'
+
+        self.explained_shapes[shape] = plan
+        return plan
+
+    def log_slow_query(self, sql: str, params, duration: float, stats: QueryStats=None):
+        """
+        Logs a slow query.
+
+        :param sql: The sql of the query.
+        :param params: The params of the query.
+        :param duration: The seconds the query took to run.
+        :param stats: The stats of the request the query was run in.
+        """
+        shape = get_query_shape(sql)
+        shape_id = hashlib.sha1(shape.encode('utf8')).hexdigest()[:12]
+        plan = self.get_plan_for_shape(shape, sql, params)
+        endpoint = (stats.endpoint if stats is not None else None)
+
+        slow_query_logger.warning(
+            'Slow query (%.2fms) in %s [shape %s]: %s %r%s',
+            duration * 1000,
+            endpoint,
+            shape_id,
+            sql,
+            params,
+            (f'\nPlan: {plan}' if plan is not None else ''),
+            extra={
+                'sql': sql,
+                'params': params,
+                'duration': duration,
+                'endpoint': endpoint,
+                'shape': shape_id,
+                'plan': plan,
+            },
+        )
+
+
+class InstrumentedMySQLDatabase(QueryStatsMixin, MySQLDatabase):
+    """A MySQL database that records query stats."""
+
+
+class InstrumentedPooledMySQLDatabase(QueryStatsMixin, PooledMySQLDatabase):
+    """A pooled MySQL database that records query stats."""
+
+
+class InstrumentedSqliteDatabase(QueryStatsMixin, SqliteDatabase):
+    """A SQLite database that records query stats."""
+
+    explain_prefix = 'EXPLAIN QUERY PLAN'
+
+
+class InstrumentedPooledSqliteDatabase(QueryStatsMixin, PooledSqliteDatabase):
+    """A pooled SQLite database that records query stats."""
+
+    explain_prefix = 'EXPLAIN QUERY PLAN'
@@ -0,0 +1,237 @@
+import argparse
+import os
+import time
+
+from peewee import fn
+from playhouse.migrate import SchemaMigrator, migrate
+from installies.config import database, database_engine, script_storage
+from installies.lib.files import syncer
+from installies.models.script import Script, ScriptBlob, ScriptRevision
+from installies.models.pack import PackEntry
+from installies.models.maintainer import Maintainer
+from installies.database.search import full_text_indexes
+from installies.storage import storage
+
+
+def migrate_schema():
+    """Creates the tables, columns, and indexes that were added after the database was created."""
+    database.create_tables([ScriptBlob, ScriptRevision, PackEntry], safe=True)
+
+    migrator = SchemaMigrator.from_database(database)
+    columns = [column.name for column in database.get_columns('script')]
+
+    if 'content_hash' not in columns:
+        migrate(migrator.add_column('script', 'content_hash', Script.blob))
+
+    if 'artifact_hash' not in columns:
+        migrate(migrator.add_column('script', 'artifact_hash', Script.artifact))
+
+    # revisions were made with a TEXT data column, which only holds 64KB on MySQL
+    revision_columns = {column.name: column for column in database.get_columns('scriptrevision')}
+    if database_engine == 'mysql' and revision_columns['data'].data_type.lower() == 'text':
+        migrate(migrator.alter_column_type('scriptrevision', 'data', ScriptRevision.data))
+
+    for index in full_text_indexes:
+        index.create()
+
+    maintainer_indexes = [index.name for index in database.get_indexes('maintainer')]
+    if 'maintainer_user_id_group_id' not in maintainer_indexes:
+        # users that were added to a group twice only keep their first row. The ids are
+        # loaded first, since MySQL cannot delete from a table it selects from.
+        first_ids = [
+            maintainer_id for maintainer_id, in
+            Maintainer
+            .select(fn.MIN(Maintainer.id))
+            .group_by(Maintainer.user, Maintainer.group)
+            .tuples()
+        ]
+        Maintainer.delete().where(Maintainer.id.not_in(first_ids)).execute()
+        migrate(migrator.add_index('maintainer', ('user_id', 'group_id'), True))
+
+
+def migrate_script(script: Script, old_files: list[str]) -> bool:
+    """
+    Moves a script's content to where it is stored now.
+
+    The content is copied to the configured storage before the script's filepath
+    is changed. The old file is added to old_files instead of being removed, since
+    other workers read the old filepath until the transaction is committed. True is
+    returned if the script was moved.
+
+    :param script: The script to move.
+    :param old_files: The list to add the files that can be removed after the commit to.
+    """
+    old_filepath = script.filepath
+    content_hash = script.content_hash
+
+    if content_hash is not None:
+        new_filepath = ScriptBlob.get_path(content_hash)
+        moved = False
+
+        # the content is missing if it is in the old layout, or the storage was changed
+        if storage.exists(content_hash) is False:
+            with open(old_filepath, 'rb') as f:
+                storage.put(content_hash, f.read())
+            moved = True
+
+        if old_filepath != new_filepath:
+            # every script with the same content used the old file
+            with database.atomic():
+                (
+                    Script
+                    .update(filepath=new_filepath)
+                    .where(Script.blob == content_hash)
+                    .execute()
+                )
+            moved = True
+
+        if moved is False:
+            return False
+
+    else:
+        with open(old_filepath) as f:
+            content = f.read()
+
+        with database.atomic():
+            blob = ScriptBlob.store(content)
+
+            # the script is not changed if it was edited after it was read
+            updated = (
+                Script
+                .update(blob=blob, filepath=blob.filepath)
+                .where((Script.id == script.id) & (Script.filepath == old_filepath))
+                .execute()
+            )
+            if updated == 0:
+                ScriptBlob.release(blob.hash)
+                return False
+
+        content_hash = blob.hash
+
+    # the old file is still used if it is where the content is stored now
+    if old_filepath != storage.get_path(content_hash):
+        old_files.append(old_filepath)
+
+    return True
+
+
+def get_script_batches(batch_size: int=100, pause: float=0):
+    """
+    Gets all the scripts in batches, ordered by id.
+
+    Each batch is only queried after the one before it is used, so the site
+    can keep running while the scripts are changed.
+
+    :param batch_size: The amount of scripts in each batch.
+    :param pause: The seconds to wait between batches.
+    """
+    last_id = 0
+
+    while True:
+        scripts = list(
+            Script
+            .select()
+            .where(Script.id > last_id)
+            .order_by(Script.id)
+            .limit(batch_size)
+        )
+        if scripts == []:
+            break
+
+        yield scripts
+
+        last_id = scripts[-1].id
+
+        if pause > 0:
+            time.sleep(pause)
+
+
+def migrate_scripts(batch_size: int=100, pause: float=0) -> int:
+    """
+    Moves the content of every script to where it is stored now, and returns the amount moved.
+
+    :param batch_size: The amount of scripts in each batch.
+    :param pause: The seconds to wait between batches.
+    """
+    moved = 0
+
+    for scripts in get_script_batches(batch_size, pause):
+        old_files = []
+
+        # each batch is committed on its own, so a failure only rolls back the batch
+        # it happened in, and the command can be run again to finish the rest
+        with database.atomic():
+            for script in scripts:
+                if migrate_script(script, old_files):
+                    moved += 1
+
+        # the old files are only removed once no committed script points at them
+        for filepath in old_files:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+        print(f'Checked scripts up to id {scripts[-1].id}, {moved} moved.')
+
+    return moved
+
+
+def build_artifacts(batch_size: int=100, pause: float=0, rebuild: bool=False) -> int:
+    """
+    Builds the artifacts of the scripts that do not have one or its compressed copy, and returns
+    the amount built.
+
+    :param batch_size: The amount of scripts in each batch.
+    :param pause: The seconds to wait between batches.
+    :param rebuild: If true, every script's artifact is rebuilt, e.g. after a shell is changed.
+    """
+    built = 0
+
+    for scripts in get_script_batches(batch_size, pause):
+        for script in scripts:
+            missing = (
+                script.artifact_hash is None
+                or storage.exists(script.artifact_hash) is False
+                or script.has_compressed_artifact is False
+            )
+
+            if rebuild or missing:
+                script.build_artifact()
+                built += 1
+
+        print(f'Checked scripts up to id {scripts[-1].id}, {built} artifacts built.')
+
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m installies.database.migrate',
+        description='Updates the database tables and script files of an existing Installies install.',
+    )
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--pause', type=float, default=0, help='The seconds to wait between batches.')
+    parser.add_argument(
+        '--rebuild-artifacts',
+        action='store_true',
+        help='Rebuild the artifacts of every script, e.g. after a shell is changed.',
+    )
+    args = parser.parse_args()
+
+    # the scripts' files would be removed after their content is only copied into memory
+    if script_storage == 'memory':
+        parser.error('Scripts cannot be migrated to the memory storage.')
+
+    # no transaction is held around the migration, so each batch is committed as it is done
+    with database.connection_context():
+        migrate_schema()
+        moved = migrate_scripts(args.batch_size, args.pause)
+        built = build_artifacts(args.batch_size, args.pause, args.rebuild_artifacts)
+
+    # with the interval fsync policy, the last files written may not be synced yet
+    syncer.flush()
+
+    print(f'Done, {moved} scripts were moved and {built} artifacts were built.')
+
+
+if __name__ == '__main__':
+    main()
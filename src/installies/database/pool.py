@@ -0,0 +1,102 @@
+import heapq
+import time
+
+from playhouse.pool import (
+    PooledMySQLDatabase as BasePooledMySQLDatabase,
+    PooledSqliteDatabase as BasePooledSqliteDatabase,
+)
+
+
+class StatsPoolMixin:
+    """
+    A mixin for peewee pooled databases that adds an idle timeout and usage stats.
+
+    Peewee's ``stale_timeout`` recycles connections by their total age, this
+    mixin calls that the recycle age. The stale timeout is how long a connection
+    can sit unused in the pool before it is closed.
+
+    :param stale_timeout: The seconds an idle connection can stay in the pool.
+    :param recycle_age: The seconds a connection can live before being recycled.
+    """
+
+    def __init__(self, database, stale_timeout=None, recycle_age=None, **kwargs):
+        self.idle_timeout = stale_timeout
+        self._returned_at = {}
+
+        self.checkout_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+        super().__init__(database, stale_timeout=recycle_age, **kwargs)
+
+    def connect(self, reuse_if_open=False):
+        """Gets a connection from the pool, recording how long it took."""
+        start = time.monotonic()
+        result = super().connect(reuse_if_open)
+        wait_time = time.monotonic() - start
+
+        with self._pool_lock:
+            self.checkout_count += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return result
+
+    def _connect(self):
+        with self._pool_lock:
+            self.close_idle_expired()
+            conn = super()._connect()
+            self._returned_at.pop(self.conn_key(conn), None)
+            return conn
+
+    def _close(self, conn, close_conn=False):
+        with self._pool_lock:
+            super()._close(conn, close_conn)
+            if close_conn is False:
+                self._returned_at[self.conn_key(conn)] = time.time()
+
+    def close_idle_expired(self):
+        """Closes the idle connections that have been unused longer than the stale timeout."""
+        if not self.idle_timeout:
+            return
+
+        cutoff = time.time() - self.idle_timeout
+
+        with self._pool_lock:
+            kept = []
+            returned_at = {}
+            for entry in self._connections:
+                key = self.conn_key(entry[2])
+                if self._returned_at.get(key, cutoff) < cutoff:
+                    self._close_raw(entry[2])
+                    continue
+                kept.append(entry)
+                returned_at[key] = self._returned_at.get(key, time.time())
+
+            heapq.heapify(kept)
+            self._connections = kept
+            self._returned_at = returned_at
+
+    def stats(self) -> dict:
+        """Gets the size of the pool and how long requests waited for connections."""
+        with self._pool_lock:
+            return {
+                'max_connections': self._max_connections,
+                'in_use': len(self._in_use),
+                'idle': len(self._connections),
+                'checkouts': self.checkout_count,
+                'total_wait_time': self.total_wait_time,
+                'average_wait_time': (
+                    self.total_wait_time / self.checkout_count
+                    if self.checkout_count > 0 else 0.0
+                ),
+                'max_wait_time': self.max_wait_time,
+            }
+
+
+class PooledMySQLDatabase(StatsPoolMixin, BasePooledMySQLDatabase):
+    """A pooled MySQL database that keeps usage stats."""
+
+
+class PooledSqliteDatabase(StatsPoolMixin, BasePooledSqliteDatabase):
+    """A pooled SQLite database that keeps usage stats."""
@@ -0,0 +1,276 @@
+from functools import reduce
+from peewee import Expression, Table, Select
+from playhouse.mysql_ext import Match
+from installies.config import database, database_engine, full_text_search
+from installies.models.app import App
+from installies.models.script import Script
+
+import re
+
+
+class FullTextIndex:
+    """
+    A base class for full-text indexes over the text fields of a model.
+
+    Keywords are split into words, and every word has to be the start of a
+    word in one of the searched fields.
+
+    :param model: The model to index.
+    :param field_names: The names of the fields to index.
+    """
+
+    def __init__(self, model, field_names: list[str]):
+        self.model = model
+        self.field_names = field_names
+
+    @property
+    def name(self) -> str:
+        """The name of the index."""
+        return f'{self.model._meta.table_name}_search'
+
+    @staticmethod
+    def get_words(keywords: list[str]) -> list[str]:
+        """
+        Splits keywords into the words the index can search for.
+
+        :param keywords: The keywords.
+        """
+        return [word for keyword in keywords for word in re.findall(r'\w+', keyword)]
+
+    def can_index(self, word: str) -> bool:
+        """
+        Checks if the index holds a word, so it can be searched for.
+
+        :param word: The word.
+        """
+        return True
+
+    def can_search(self, keyword: str) -> bool:
+        """
+        Checks if a keyword can be searched for with the index.
+
+        Keywords without any words, or with words the index does not hold, have
+        to be searched for with LIKE instead.
+
+        :param keyword: The keyword.
+        """
+        words = self.get_words([keyword])
+        return words != [] and all(self.can_index(word) for word in words)
+
+    def create(self):
+        """Creates the index, and fills it with the rows that already exist."""
+        raise NotImplementedError
+
+    def drop(self):
+        """Drops the index."""
+        raise NotImplementedError
+
+    def match_ids(self, words: list[str], field_names: list[str]) -> Select:
+        """
+        Gets a query of the ids of the rows that match all the words.
+
+        :param words: The words to search for.
+        :param field_names: The names of the fields to search in.
+        """
+        raise NotImplementedError
+
+    def match_scores(self, words: list[str], field_names: list[str]) -> Select:
+        """
+        Gets a query of the ids of the rows that match all the words, and how well they match.
+
+        The ids are in the "id" column, and the scores in the "score" column. The
+        rows that match best have the highest score.
+
+        :param words: The words to search for.
+        :param field_names: The names of the fields to search in.
+        """
+        raise NotImplementedError
+
+
+class MySQLFullTextIndex(FullTextIndex):
+    """
+    A full-text index using MySQL's FULLTEXT indexes.
+
+    InnoDB can only match against a list of columns that has its own index, so
+    every field has its own index. Words shorter than ``innodb_ft_min_token_size``
+    and stopwords are not in the indexes, so they cannot be searched for with them.
+    """
+
+    # the words InnoDB leaves out of FULLTEXT indexes by default
+    stopwords = {
+        'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from',
+        'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to',
+        'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www',
+    }
+
+    def __init__(self, model, field_names: list[str]):
+        super().__init__(model, field_names)
+        self._min_word_length = None
+
+    @property
+    def min_word_length(self) -> int:
+        """The length of the shortest words in the indexes. It is loaded the first time it is used."""
+        if self._min_word_length is None:
+            row = database.execute_sql("SHOW VARIABLES LIKE 'innodb_ft_min_token_size'").fetchone()
+            self._min_word_length = (int(row[1]) if row is not None else 3)
+
+        return self._min_word_length
+
+    def can_index(self, word: str) -> bool:
+        return len(word) >= self.min_word_length and word.lower() not in self.stopwords
+
+    def get_index_name(self, field_name: str) -> str:
+        """
+        Gets the name of the FULLTEXT index of a field.
+
+        :param field_name: The name of the field.
+        """
+        return f'{self.name}_{field_name}'
+
+    def create(self):
+        table_name = self.model._meta.table_name
+        existing = [index.name for index in database.get_indexes(table_name)]
+
+        for field_name in self.field_names:
+            index_name = self.get_index_name(field_name)
+            if index_name in existing:
+                continue
+
+            column_name = getattr(self.model, field_name).column_name
+            database.execute_sql(
+                f'CREATE FULLTEXT INDEX `{index_name}` ON `{table_name}` (`{column_name}`)'
+            )
+
+    def drop(self):
+        # the indexes are dropped with their table
+        pass
+
+    def match(self, field_name: str, query: str):
+        """
+        Makes a boolean mode MATCH expression for a field.
+
+        :param field_name: The name of the field.
+        :param query: The boolean mode query.
+        """
+        return Match(getattr(self.model, field_name), query, 'IN BOOLEAN MODE')
+
+    def match_ids(self, words: list[str], field_names: list[str]) -> Select:
+        # every word has to be in one of the fields, like searching with LIKE
+        condition = reduce(
+            lambda a, b: a & b,
+            [
+                reduce(lambda a, b: a | b, [self.match(name, f'+{word}*') for name in field_names])
+                for word in words
+            ],
+        )
+
+        return self.model.select(self.model.id).where(condition)
+
+    def match_scores(self, words: list[str], field_names: list[str]) -> Select:
+        query = ' '.join(f'{word}*' for word in words)
+        score = reduce(lambda a, b: a + b, [self.match(name, query) for name in field_names])
+
+        return self.match_ids(words, field_names).select_extend(score.alias('score'))
+
+
+class SqliteFullTextIndex(FullTextIndex):
+    """
+    A full-text index using an FTS5 table.
+
+    The FTS5 table reads its content from the model's table, and is kept up to
+    date by triggers, so the models do not have to update it.
+    """
+
+    @property
+    def table(self) -> Table:
+        """The FTS5 table."""
+        # the hidden column named after the table is what the queries are matched against
+        return Table(self.name, ['rowid', 'rank', self.name])
+
+    def create(self):
+        table_name = self.model._meta.table_name
+        columns = [getattr(self.model, name).column_name for name in self.field_names]
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+
+        delete_old = (
+            f'INSERT INTO {self.name}({self.name}, rowid, {column_list}) '
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = f'INSERT INTO {self.name}(rowid, {column_list}) VALUES (new.id, {new_values});'
+
+        with database.atomic():
+            database.execute_sql(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5('
+                f"{column_list}, content='{table_name}', content_rowid='id')"
+            )
+            database.execute_sql(
+                f'CREATE TRIGGER IF NOT EXISTS {self.name}_insert AFTER INSERT ON {table_name} '
+                f'BEGIN {insert_new} END'
+            )
+            database.execute_sql(
+                f'CREATE TRIGGER IF NOT EXISTS {self.name}_delete AFTER DELETE ON {table_name} '
+                f'BEGIN {delete_old} END'
+            )
+            database.execute_sql(
+                f'CREATE TRIGGER IF NOT EXISTS {self.name}_update '
+                f'AFTER UPDATE OF {column_list} ON {table_name} '
+                f'BEGIN {delete_old} {insert_new} END'
+            )
+            database.execute_sql(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')")
+
+    def drop(self):
+        with database.atomic():
+            for trigger in ['insert', 'delete', 'update']:
+                database.execute_sql(f'DROP TRIGGER IF EXISTS {self.name}_{trigger}')
+
+            database.execute_sql(f'DROP TABLE IF EXISTS {self.name}')
+
+    def make_query(self, words: list[str], field_names: list[str]) -> str:
+        """
+        Makes an FTS5 query that matches rows with all the words in the fields.
+
+        :param words: The words to search for.
+        :param field_names: The names of the fields to search in.
+        """
+        columns = ' '.join(getattr(self.model, name).column_name for name in field_names)
+        phrases = ' AND '.join(f'"{word}"*' for word in words)
+        return f'{{{columns}}} : ({phrases})'
+
+    def match_ids(self, words: list[str], field_names: list[str]) -> Select:
+        table = self.table
+        return (
+            table
+            .select(table.rowid.alias('id'))
+            .where(Expression(getattr(table, self.name), 'MATCH', self.make_query(words, field_names)))
+        )
+
+    def match_scores(self, words: list[str], field_names: list[str]) -> Select:
+        # the rank is lower for better matches, so it is negated
+        return self.match_ids(words, field_names).select_extend((0 - self.table.rank).alias('score'))
+
+
+full_text_index_classes = {
+    'mysql': MySQLFullTextIndex,
+    'sqlite': SqliteFullTextIndex,
+}
+
+
+def make_full_text_index(model, field_names: list[str]):
+    """
+    Makes a full-text index for the database engine, or returns None if full-text search is disabled.
+
+    :param model: The model to index.
+    :param field_names: The names of the fields to index.
+    """
+    if full_text_search is False:
+        return None
+
+    return full_text_index_classes[database_engine](model, field_names)
+
+
+app_index = make_full_text_index(App, ['name', 'description'])
+script_index = make_full_text_index(Script, ['description'])
+
+full_text_indexes = [index for index in [app_index, script_index] if index is not None]
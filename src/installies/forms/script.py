@@ -1,4 +1,5 @@
 from flask import g
+from installies.config import database
 from installies.forms.base import Form, FormInput
 from installies.validators.script import (
     ScriptActionValidator,
@@ -54,18 +55,20 @@ class CreateScriptForm(ModifyScriptForm):
     model = Script
     
     def save(self, app: App):
-        script = Script.create(
-            content=self.data['script-content'],
-            shell=self.data['script-shell'],
-            description=self.data['script-description'],
-            submitter=g.user,
-            app=app,
-            version=self.data['for-version'],
-            actions=self.data['script-actions'],
-            use_default_function_matcher=(True if self.data.get('script-use-default-function-matcher') is not None else False),
-        )
+        # the distros are committed with the script, so a failure never leaves it without them
+        with database.atomic():
+            script = Script.create(
+                content=self.data['script-content'],
+                shell=self.data['script-shell'],
+                description=self.data['script-description'],
+                submitter=g.user,
+                app=app,
+                version=self.data['for-version'],
+                actions=self.data['script-actions'],
+                use_default_function_matcher=(True if self.data.get('script-use-default-function-matcher') is not None else False),
+            )
 
-        distros = SupportedDistro.create_from_dict(script, self.data['script-supported-distros'])
+            distros = SupportedDistro.create_from_dict(script, self.data['script-supported-distros'])
 
         return script
 
@@ -76,19 +79,22 @@ class EditScriptForm(ModifyScriptForm):
     edit_form = True
     
     def save(self, script: Script):
-        for distro in script.supported_distros:
-            distro.delete_instance()
-        
-        SupportedDistro.create_from_dict(
-            script,
-            self.data['script-supported-distros']
-        )
-        
-        return script.edit(
-            shell=self.data['script-shell'],
-            content=self.data['script-content'],
-            description=self.data['script-description'],
-            version=self.data['for-version'],
-            use_default_function_matcher=(True if self.data.get('script-use-default-function-matcher') is not None else False),
-            actions=self.data['script-actions'],
-        )
+        # the distros are committed with the script's changes, so a failure never leaves them stale
+        with database.atomic():
+            for distro in script.supported_distros:
+                distro.delete_instance()
+
+            SupportedDistro.create_from_dict(
+                script,
+                self.data['script-supported-distros']
+            )
+
+            return script.edit(
+                shell=self.data['script-shell'],
+                content=self.data['script-content'],
+                description=self.data['script-description'],
+                version=self.data['for-version'],
+                use_default_function_matcher=(True if self.data.get('script-use-default-function-matcher') is not None else False),
+                actions=self.data['script-actions'],
+                editor=g.user,
+            )
@@ -1,14 +1,17 @@
 from installies.models.app import App
-from installies.models.maintainer import Maintainer, Maintainers
+from installies.models.maintainer import Maintainers
 from installies.models.script import Script
 from installies.models.supported_distros import SupportedDistro
 from installies.models.user import User
 from installies.groups.base import Group
+from installies.database.search import app_index
 from installies.groups.modifiers import (
     SearchableField,
     SearchInFields,
     BySupportedDistro,
     Paginate,
+    ByMaintainer,
+    BySimilarName,
 )
 from datetime import datetime
 
@@ -83,8 +86,9 @@ class AppGroup(Group):
                 SearchableField('description'),
                 SearchableField(
                     'maintainers',
-                    lambda model, name, data: Maintainer.user.username.contains(data),
-                    models=[Maintainers, Maintainer, User],
+                    lambda model, name, data: model.maintainers.in_(
+                        Maintainers.get_group_ids(data, exact=False)
+                    ),
                 ),
                 SearchableField(
                     'submitter',
@@ -93,10 +97,85 @@ class AppGroup(Group):
                 ),
             ],
             default_field = 'name',
+            full_text_index = app_index,
         )
 
-        query = search_modifier.modify(query, params)
+        # gets the apps with similar names instead, if the user asked for them
+        if params.get('fuzzy', 'no') == 'yes':
+            query = BySimilarName().modify(query, params)
+        else:
+            query = search_modifier.modify(query, params)
+
         query = query.switch(cls.model)
 
+        # gets the objects maintained by a user
+        query = ByMaintainer(cls.model).modify(query, params)
+
+        # every filter uses a subquery or a join to a single row, so each object is only
+        # returned once, without DISTINCT.
+        return query
+
+    @classmethod
+    def get_or_similar(cls, params) -> tuple:
+        """
+        Gets the apps, or the apps with names similar to the keywords if none have the name.
+
+        The user may have mistyped the name, so if searching by it finds nothing, the
+        apps with similar names are gotten instead. A tuple of the query, the params it
+        was gotten with, and whether the similar names were gotten instead, is returned.
+
+        :param params: The parameters submitted by the user to get the apps.
+        """
+        apps = cls.get(params)
+
+        similar_params = cls.get_similar_params(params)
+        if similar_params is None or apps.exists():
+            return apps, params, False
+
+        return cls.get(similar_params), similar_params, True
+
+    @classmethod
+    def get_similar_params(cls, params):
+        """
+        Gets params for getting the apps with names similar to the keywords.
+
+        This is used when searching by name found nothing, since the user may have mistyped
+        the name. None is returned if the params do not search by name.
+
+        :param params: The params that found nothing.
+        """
+        if params.get('k', '') == '' or params.get('fuzzy', 'no') == 'yes':
+            return None
+
+        search_in = [name.strip() for name in params.get('search-in', 'name').split(',')]
+        if 'name' not in search_in:
+            return None
+
+        return {**{key: value for key, value in params.items()}, 'fuzzy': 'yes'}
+
+    @classmethod
+    def prefetch(cls, apps) -> list:
+        """
+        Gets apps in a list, with their submitters, maintainers, and the maintainers' users loaded.
+
+        Loading them takes two queries, no matter how many apps there are. Checking if a user can
+        edit the apps does not need any queries after this.
+
+        :param apps: A query or list of apps.
+        """
+        apps = list(apps)
+
+        if apps == []:
+            return apps
+
+        submitters = {
+            user.id: user for user in
+            User.select().where(User.id.in_({app.submitter_id for app in apps}))
+        }
+        maintainers = Maintainers.prefetch({app.maintainers_id for app in apps})
+
+        for app in apps:
+            app.submitter = submitters[app.submitter_id]
+            app.maintainers = maintainers[app.maintainers_id]
 
-        return query.distinct()
+        return apps
@@ -1,7 +1,8 @@
-from peewee import Query
+from peewee import Query, Case
 from installies.models.app import App
 from installies.models.script import Script, Action
 from installies.models.supported_distros import SupportedDistro
+from installies.models.maintainer import Maintainers
 from functools import reduce
 
 import typing as t
@@ -54,15 +55,21 @@ class SearchInFields(Modifier):
     The user can choose what fields to search in with a comman separated list
     in the 'search_in' kwargs. The search keywords go in the 'k' param.
 
+    Fields in the full-text index are searched with it instead of LIKE. If only
+    indexed fields are searched, the results are sorted by relevance, unless the
+    'sort-by' param is something other than 'relevance'.
+
     :param model: The model to search in.
     :param allowed_fields: The fields the user can search in.
     :param default_field: The field to search in by default.
+    :param full_text_index: The full-text index of the model, or None to always use LIKE.
     """
 
-    def __init__(self, model, searchable_fields, default_field):
+    def __init__(self, model, searchable_fields, default_field, full_text_index=None):
         self.model = model
         self.searchable_fields = searchable_fields
         self.default_field = default_field
+        self.full_text_index = full_text_index
 
     def modify(self, query: Query, param):
         """
@@ -86,17 +93,63 @@ class SearchInFields(Modifier):
             search_in_fields.extend([attr for attr in self.searchable_fields if attr.name == name])
 
         if search_in_fields == []:
-            search_in_fields = [default_field]
+            search_in_fields = [
+                attr for attr in self.searchable_fields if attr.name == self.default_field
+            ]
+
+        keywords = keywords.split()
+
+        full_text_fields = []
+        if self.full_text_index is not None:
+            full_text_fields = [
+                field for field in search_in_fields
+                if field.name in self.full_text_index.field_names
+            ]
+
+        full_text_names = [field.name for field in full_text_fields]
+        other_fields = [field for field in search_in_fields if field not in full_text_fields]
+
+        # keywords the index cannot search for, like stopwords, are searched for with LIKE
+        full_text_keywords = []
+        if full_text_fields != []:
+            full_text_keywords = [
+                keyword for keyword in keywords if self.full_text_index.can_search(keyword)
+            ]
+
+        if full_text_fields != [] and other_fields == [] and full_text_keywords == keywords:
+            words = self.full_text_index.get_words(keywords)
+            matches = self.full_text_index.match_scores(words, full_text_names).alias('matches')
+            query = (
+                query
+                .select_extend(matches.c.score)
+                .join(matches, on=(self.model.id == matches.c.id))
+            )
 
-        for field in search_in_fields:
+            if param.get('sort-by', 'relevance') == 'relevance':
+                query = query.order_by(matches.c.score.desc(), self.model.id)
+
+            return query
+
+        for field in other_fields:
             for model in field.models:
                 query = query.join(model)
 
-        keywords = keywords.split()
         for keyword in keywords:
-            query = query.where(
-                reduce(lambda a, b: a | b, [field.contains(self.model, keyword) for field in search_in_fields])
-            )
+            # the indexed fields are searched with the index if it can, and the other fields with LIKE
+            if keyword in full_text_keywords:
+                conditions = [field.contains(self.model, keyword) for field in other_fields]
+                conditions.append(
+                    self.model.id.in_(
+                        self.full_text_index.match_ids(
+                            self.full_text_index.get_words([keyword]),
+                            full_text_names,
+                        )
+                    )
+                )
+            else:
+                conditions = [field.contains(self.model, keyword) for field in search_in_fields]
+
+            query = query.where(reduce(lambda a, b: a | b, conditions))
 
         return query
 
@@ -108,16 +161,14 @@ class BySupportedDistro(Modifier):
     This only works on App and Script object. This is becuase the SupportedDistro object only
     contains backrefs to App and Script. It used the 'distro' and 'arch' url params.
     """
-    
-    def modify(self, query: Query, params):
-        """
-        Modifies the query to only contain objects that support a specific distro.
 
-        If 'distro' or 'arch' param is not present, it is a wildcard to match any distro
-        or architecture.
+    @staticmethod
+    def get_params(params) -> tuple[str, str]:
         """
+        Gets the distro and architecture from the params, with '*' if they are not present.
 
-        # gets the distro and architecture
+        :param params: The params.
+        """
         distro = params.get('distro', '').lower()
         arch = params.get('arch', '').lower()
 
@@ -127,21 +178,104 @@ class BySupportedDistro(Modifier):
         if arch == '':
             arch = '*'
 
+        return distro, arch
+
+    @staticmethod
+    def supports(field, value: str):
+        """
+        Makes a condition for a SupportedDistro field matching a value, or the '*' wildcard.
+
+        If the value is the wildcard, every row matches, so None is returned.
+
+        :param field: The distro_name or architecture_name field.
+        :param value: The value to match.
+        """
+        if value == '*':
+            return None
+
+        return (field == value) | (field == '*')
+
+    def modify(self, query: Query, params):
+        """
+        Modifies the query to only contain objects that support a specific distro.
+
+        If 'distro' or 'arch' param is not present, it is a wildcard to match any distro
+        or architecture.
+        """
+
+        distro, arch = self.get_params(params)
+
+        # the scripts are found with a subquery instead of a join, so each object is only
+        # returned once, without DISTINCT.
+        scripts = SupportedDistro.select(SupportedDistro.script)
+
+        for condition in [
+                self.supports(SupportedDistro.distro_name, distro),
+                self.supports(SupportedDistro.architecture_name, arch),
+        ]:
+            if condition is not None:
+                scripts = scripts.where(condition)
+
         if query.model == App:
-            query = query.join(Script)
-        
-        query = (
-            query
-            .join(SupportedDistro)
-        )
+            return query.where(App.id.in_(Script.select(Script.app).where(Script.id.in_(scripts))))
+
+        return query.where(Script.id.in_(scripts))
+
+
+class ByMaintainer(Modifier):
+    """
+    A modifier class for getting the objects a user maintains.
+
+    This works on any model with a maintainers field. It uses the 'maintained-by' param,
+    which is the username of the maintainer.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def modify(self, query: Query, params):
+        """
+        Modifies the query to only contain objects maintained by the user.
+
+        If the 'maintained-by' param is not present, the unmodified query is returned.
+        """
+        username = params.get('maintained-by', '')
+        if username == '':
+            return query
+
+        return query.where(self.model.maintainers.in_(Maintainers.get_group_ids(username)))
+
+
+class BySimilarName(Modifier):
+    """
+    A modifier class for getting apps with names similar to the keywords, for when the user mistyped them.
+
+    It uses the 'k' param, only if the 'fuzzy' param is 'yes'. The apps are ordered by how
+    similar their names are, unless the 'sort-by' param is something other than 'relevance'.
+
+    :param limit: The max amount of similar apps.
+    """
+
+    def __init__(self, limit: int=50):
+        self.limit = limit
+
+    def modify(self, query: Query, params):
+        """
+        Modifies the query to only contain apps with names similar to the keywords.
+
+        If the 'fuzzy' param is not 'yes' or the 'k' param is not present, the unmodified query
+        is returned.
+        """
+        keywords = params.get('k', '')
+        if params.get('fuzzy', 'no') != 'yes' or keywords == '':
+            return query
+
+        app_ids = App.get_similar_ids(keywords, self.limit)
+        query = query.where(App.id.in_(app_ids))
+
+        if app_ids != [] and params.get('sort-by', 'relevance') == 'relevance':
+            query = query.order_by(Case(App.id, list(zip(app_ids, range(len(app_ids))))))
 
-        query = query.where(
-            reduce(
-                lambda a, b: a & b,
-                [(((SupportedDistro.distro_name == distro) | (SupportedDistro.distro_name == '*')) if distro != '*' else True) & (((SupportedDistro.architecture_name == arch) | (SupportedDistro.architecture_name == '*')) if arch != '*' else True)]
-            )
-        )
-        
         return query
 
 
@@ -183,22 +317,19 @@ class BySupportedAction(Modifier):
     """"
     A modifier class for getting by supported actions.
 
-    This only works on Script objects. It uses the 'actions' param in the url.
+    This only works on Script objects. It uses the 'actions' param in the url, a comma
+    separated list of actions the scripts have to support.
     """
 
     def modify(self, query: Query, params):
-        if 'actions' not in params.keys():
+        if params.get('actions', '') == '':
             return query
 
-        alias = Action.alias()
-        
         actions = [action.strip() for action in params['actions'].split(',')]
-        
-        query = query.join(Action)
-        
+
         for action in actions:
             query = query.where(
-                alias.name.contains(action)
+                Script.id.in_(Action.select(Action.script).where(Action.name == action))
             )
 
         return query
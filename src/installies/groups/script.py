@@ -1,17 +1,22 @@
 from installies.models.app import App
-from installies.models.script import Script
+from installies.models.script import Script, Action
 from installies.models.supported_distros import SupportedDistro
-from installies.models.maintainer import Maintainer, Maintainers
+from installies.models.maintainer import Maintainers
 from installies.models.user import User
 from installies.groups.base import Group
+from installies.database.search import script_index
+from installies.storage import storage
 from installies.groups.modifiers import (
     SearchableField,
     SearchInFields,
     BySupportedDistro,
     Paginate,
+    ByMaintainer,
     BySupportedAction,
     BySupportedShell,
 )
+from peewee import Case, Value, fn
+from functools import reduce
 from datetime import datetime
 
 
@@ -82,6 +87,9 @@ class ScriptGroup(Group):
         # gets the scripts by supported shell
         query = BySupportedShell().modify(query, params)
         query = query.switch(cls.model)
+
+        # gets the scripts by supported actions
+        query = BySupportedAction().modify(query, params)
         
         # gets the scripts by search
         search_modifier = SearchInFields(
@@ -93,8 +101,9 @@ class ScriptGroup(Group):
                 ),
                 SearchableField(
                     'maintainers',
-                    lambda model, name, data: Maintainer.user.username.contains(data),
-                    models=[Maintainers, Maintainer, User],
+                    lambda model, name, data: model.maintainers.in_(
+                        Maintainers.get_group_ids(data, exact=False)
+                    ),
                 ),
                 SearchableField(
                     'submitter',
@@ -103,9 +112,152 @@ class ScriptGroup(Group):
                 ),
             ],
             default_field = 'maintainers',
+            full_text_index = script_index,
         )
 
         query = search_modifier.modify(query, params)
         query = query.switch(cls.model)
 
-        return query.distinct()
+        # gets the objects maintained by a user
+        query = ByMaintainer(cls.model).modify(query, params)
+
+        # every filter uses a subquery or a join to a single row, so each object is only
+        # returned once, without DISTINCT.
+        return query
+
+    @classmethod
+    def get_ids(cls, params, excluded_params: list[str], query=None):
+        """
+        Gets a query of the ids of the scripts that match the params, without some of them.
+
+        :param params: The parameters submitted by the user to get the scripts.
+        :param excluded_params: The names of the params to leave out.
+        :param query: A query to use instead of cls.model.select().
+        """
+        params = {key: value for key, value in params.items() if key not in excluded_params}
+        return cls.get(params, query).select(cls.model.id).order_by()
+
+    @classmethod
+    def get_facets(cls, params, query=None) -> dict:
+        """
+        Counts how many scripts each distro, architecture, shell, and action would give.
+
+        The counts of a facet are of the scripts that match every param except the
+        facet's own, so they are what the user gets by changing it. Scripts that
+        support any distro or architecture are counted in every value. All the
+        facets are counted with one query.
+
+        A dictionary with the facets' param names as keys, and lists of (value, count)
+        tuples sorted by the count as values, is returned.
+
+        :param params: The parameters submitted by the user to get the scripts.
+        :param query: A query to use instead of cls.model.select().
+        """
+        distro, arch = BySupportedDistro.get_params(params)
+
+        # the distro and architecture are matched on the same supported distro row
+        distro_ids = cls.get_ids(params, ['distro', 'arch'], query)
+        counts = []
+        for name, field, other_field, other_value in [
+                ('distro', SupportedDistro.distro_name, SupportedDistro.architecture_name, arch),
+                ('arch', SupportedDistro.architecture_name, SupportedDistro.distro_name, distro),
+        ]:
+            rows = SupportedDistro.script.in_(distro_ids)
+            other_condition = BySupportedDistro.supports(other_field, other_value)
+            if other_condition is not None:
+                rows = rows & other_condition
+
+            # scripts with a * row are added to every value below, so their other rows
+            # only list the value, without counting the script twice
+            wildcard_scripts = SupportedDistro.select(SupportedDistro.script).where(rows & (field == '*'))
+            script = Case(None, [(SupportedDistro.script.not_in(wildcard_scripts), SupportedDistro.script)])
+
+            counts.append(
+                SupportedDistro
+                .select(Value(name), field, fn.COUNT(script.distinct()))
+                .where(rows & (field != '*'))
+                .group_by(field)
+            )
+            counts.append(
+                SupportedDistro
+                .select(Value(name), Value('*'), fn.COUNT(SupportedDistro.script.distinct()))
+                .where(rows & (field == '*'))
+            )
+
+        counts.append(
+            cls.model
+            .select(Value('shell'), cls.model.shell, fn.COUNT(cls.model.id))
+            .where(cls.model.id.in_(cls.get_ids(params, ['shell'], query)))
+            .group_by(cls.model.shell)
+        )
+        counts.append(
+            Action
+            .select(Value('actions'), Action.name, fn.COUNT(Action.script.distinct()))
+            .where(Action.script.in_(cls.get_ids(params, ['actions'], query)))
+            .group_by(Action.name)
+        )
+
+        facets = {'distro': {}, 'arch': {}, 'shell': {}, 'actions': {}}
+        for name, value, count in reduce(lambda a, b: a.union_all(b), counts).tuples():
+            facets[name][value] = count
+
+        for name in ['distro', 'arch']:
+            wildcard_count = facets[name].pop('*', 0)
+            for value in facets[name]:
+                facets[name][value] += wildcard_count
+
+        return {
+            name: sorted(values.items(), key=lambda item: (-item[1], item[0]))
+            for name, values in facets.items()
+        }
+
+    @classmethod
+    def prefetch(cls, scripts) -> list:
+        """
+        Gets scripts in a list, with their apps, submitters, maintainers, actions, and supported
+        distros loaded. Where their artifacts are stored is loaded too, for storages that need it.
+
+        Loading them takes at most six queries, no matter how many scripts there are.
+
+        :param scripts: A query or list of scripts.
+        """
+        scripts = list(scripts)
+
+        if scripts == []:
+            return scripts
+
+        script_ids = [script.id for script in scripts]
+
+        apps = {
+            app.id: app for app in
+            App.select().where(App.id.in_({script.app_id for script in scripts}))
+        }
+        submitters = {
+            user.id: user for user in
+            User.select().where(User.id.in_({script.submitter_id for script in scripts}))
+        }
+        maintainers = Maintainers.prefetch({script.maintainers_id for script in scripts})
+
+        actions = {}
+        for action in Action.select().where(Action.script.in_(script_ids)).order_by(Action.id):
+            actions.setdefault(action.script_id, []).append(action)
+
+        supported_distros = {}
+        for distro in (
+                SupportedDistro
+                .select()
+                .where(SupportedDistro.script.in_(script_ids))
+                .order_by(SupportedDistro.id)
+        ):
+            supported_distros.setdefault(distro.script_id, []).append(distro)
+
+        storage.preload([script.artifact_hash for script in scripts if script.artifact_hash is not None])
+
+        for script in scripts:
+            script.app = apps[script.app_id]
+            script.submitter = submitters[script.submitter_id]
+            script.maintainers = maintainers[script.maintainers_id]
+            script.actions = actions.get(script.id, [])
+            script.supported_distros = supported_distros.get(script.id, [])
+
+        return scripts
@@ -0,0 +1,89 @@
+import threading
+import time
+import typing as t
+
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A thread safe least recently used cache where items expire after a time to live.
+
+    When the cache is full, the least recently used item is removed to make room.
+
+    :param max_size: The max amount of items in the cache.
+    :param ttl: The amount of seconds an item stays in the cache.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Gets an item from the cache.
+
+        The default is returned if the item is not in the cache or has expired.
+
+        :param key: The key of the item.
+        :param default: The value to return if the item is not found.
+        """
+        with self._lock:
+            item = self._items.get(key)
+
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return default
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Adds an item to the cache.
+
+        :param key: The key of the item.
+        :param value: The value of the item.
+        """
+        if self.max_size < 1:
+            return
+
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Removes an item from the cache. Nothing happens if it is not in the cache.
+
+        :param key: The key of the item.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+
+    def delete_matching(self, check: t.Callable):
+        """
+        Removes all the items whose value passes a check.
+
+        :param check: A callable that takes a value, and returns True if it should be removed.
+        """
+        with self._lock:
+            for key in [key for key, item in self._items.items() if check(item[1])]:
+                del self._items[key]
+
+    def clear(self):
+        """Removes all the items in the cache."""
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
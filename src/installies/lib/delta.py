@@ -0,0 +1,47 @@
+from difflib import SequenceMatcher
+
+import json
+
+
+def make_delta(old: str, new: str) -> str:
+    """
+    Makes a delta that turns the old text into the new text.
+
+    The delta is a json list. Lists in it are ranges of lines to copy from the
+    old text, and strings are new text to add.
+
+    :param old: The old text.
+    :param new: The new text.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+    operations = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([old_start, old_end])
+        elif new_end > new_start:
+            operations.append(''.join(new_lines[new_start:new_end]))
+
+    return json.dumps(operations, separators=(',', ':'))
+
+
+def apply_delta(old: str, delta: str) -> str:
+    """
+    Applies a delta made by ``make_delta`` to the old text, and returns the new text.
+
+    :param old: The old text.
+    :param delta: The delta.
+    """
+    old_lines = old.splitlines(keepends=True)
+
+    parts = []
+    for operation in json.loads(delta):
+        if isinstance(operation, list):
+            parts.extend(old_lines[operation[0]:operation[1]])
+        else:
+            parts.append(operation)
+
+    return ''.join(parts)
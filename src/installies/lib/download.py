@@ -0,0 +1,100 @@
+from flask import current_app, send_file
+from installies.config import apps_path, sendfile_header, sendfile_prefix
+from datetime import datetime
+
+import os
+import typing as t
+
+
+def send_download(
+        path: str,
+        mimetype: str,
+        download_name: str,
+        last_modified: datetime=None,
+        content_encoding: str=None,
+):
+    """
+    Sends a file from the upload path as a download.
+
+    If a sendfile header is configured, the response only has the header, and
+    the reverse proxy sends the file. Otherwise the file is streamed from disk,
+    so it is never read into memory all at once.
+
+    :param path: The path of the file.
+    :param mimetype: The mimetype of the file.
+    :param download_name: The name the file is downloaded as.
+    :param last_modified: When the file was last modified.
+    :param content_encoding: The encoding of the file, e.g. "gzip" if it is compressed.
+    """
+    if sendfile_header == 'none':
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            download_name=download_name,
+            as_attachment=True,
+            etag=False,
+            last_modified=last_modified,
+        )
+    else:
+        response = make_proxy_response(path, mimetype, download_name, last_modified)
+
+    if content_encoding is not None:
+        response.headers['Content-Encoding'] = content_encoding
+
+    return response
+
+
+def send_download_stream(
+        chunks: t.Iterable[bytes],
+        size: int,
+        mimetype: str,
+        download_name: str,
+        last_modified: datetime=None,
+        content_encoding: str=None,
+):
+    """
+    Sends data that is not in its own file as a download.
+
+    :param chunks: The data to send, in chunks.
+    :param size: The size of the data in bytes.
+    :param mimetype: The mimetype of the data.
+    :param download_name: The name the data is downloaded as.
+    :param last_modified: When the data was last modified.
+    :param content_encoding: The encoding of the data, e.g. "gzip" if it is compressed.
+    """
+    response = current_app.response_class(chunks, mimetype=mimetype, direct_passthrough=True)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.content_length = size
+
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    if content_encoding is not None:
+        response.headers['Content-Encoding'] = content_encoding
+
+    return response
+
+
+def make_proxy_response(path: str, mimetype: str, download_name: str, last_modified: datetime=None):
+    """
+    Makes a response that lets the reverse proxy send a file from the upload path.
+
+    :param path: The path of the file.
+    :param mimetype: The mimetype of the file.
+    :param download_name: The name the file is downloaded as.
+    :param last_modified: When the file was last modified.
+    """
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+
+    if sendfile_header == 'x-sendfile':
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    else:
+        # nginx finds the file by its path in an internal location that points to the upload path
+        relative_path = os.path.relpath(path, apps_path)
+        response.headers['X-Accel-Redirect'] = f'{sendfile_prefix.rstrip("/")}/{relative_path}'
+
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    return response
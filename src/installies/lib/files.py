@@ -0,0 +1,133 @@
+from installies.config import fsync_policy, fsync_interval
+
+import atexit
+import os
+import tempfile
+import threading
+
+
+class FileSyncer:
+    """
+    Syncs written files and their directories to disk, following a fsync policy.
+
+    The policy can be "none" to leave it to the OS, "always" to sync a file's data
+    before it is renamed into place or the database points to it, and its directory
+    before the write returns, or "interval" to sync the files and directories written
+    to together, ``interval`` seconds after the first write since the last sync. The
+    interval policy is for bulk imports, where syncing every file would be too slow,
+    and a crash only loses the writes of the last interval. The files left to sync are
+    synced when the process exits.
+
+    :param policy: The fsync policy.
+    :param interval: The seconds between syncs for the interval policy.
+    """
+
+    def __init__(self, policy: str='none', interval: float=0.1):
+        self.policy = policy
+        self.interval = interval
+        self._pending_files = set()
+        self._pending_directories = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+        atexit.register(self.flush)
+
+    def sync_data(self, f):
+        """
+        Syncs the data of an open file before it is renamed, if the policy is "always".
+
+        :param f: The open file.
+        """
+        if self.policy == 'always':
+            f.flush()
+            os.fsync(f.fileno())
+
+    def written(self, path: str):
+        """
+        Syncs the directory of a file that was just written, or marks them to be synced.
+
+        :param path: The path of the file.
+        """
+        if self.policy == 'always':
+            sync_path(os.path.dirname(path))
+
+        elif self.policy == 'interval':
+            with self._lock:
+                self._pending_files.add(path)
+                self._pending_directories.add(os.path.dirname(path))
+
+                # a timer syncs them, so the last files are synced even if nothing else is written
+                if self._timer is None:
+                    self._timer = threading.Timer(self.interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def flush(self):
+        """Syncs all the files, then the directories, that are marked to be synced."""
+        with self._lock:
+            files = self._pending_files
+            directories = self._pending_directories
+            self._pending_files = set()
+            self._pending_directories = set()
+
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        # the files could have been removed since they were written to
+        for path in list(files) + list(directories):
+            if os.path.exists(path):
+                sync_path(path)
+
+
+# the syncer for script files
+syncer = FileSyncer(fsync_policy, fsync_interval / 1000)
+
+
+def sync_path(path: str):
+    """
+    Flushes a file or directory to disk.
+
+    :param path: The path of the file or directory.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_file_atomic(path: str, data: bytes, syncer: FileSyncer=syncer):
+    """
+    Writes a file, so readers either see the old file or the new one, never part of it.
+
+    The data is written to a temporary file in the same directory, which is
+    then renamed to the path.
+
+    :param path: The path of the file.
+    :param data: The data to write.
+    :param syncer: The syncer to sync the file with, or None to not sync it.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+            # with the always policy, the data is on disk before the rename is, so a crash
+            # cannot leave an empty file
+            if syncer is not None:
+                syncer.sync_data(f)
+
+        # temporary files are only readable by their owner
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if syncer is not None:
+        syncer.written(path)
@@ -0,0 +1,256 @@
+import heapq
+import re
+import threading
+import time
+import typing as t
+
+from collections import Counter
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercases text, and replaces everything that is not a letter or number with single spaces.
+
+    :param text: The text.
+    """
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def get_trigrams(text: str, padded: bool=False) -> set[str]:
+    """
+    Gets the three character pieces of normalized text.
+
+    :param text: The normalized text.
+    :param padded: If true, each word gets the pieces of itself with spaces around it
+                   instead, so the start and end of words count more, and short words have pieces.
+    """
+    if padded:
+        return {trigram for word in text.split() for trigram in get_trigrams(f'  {word} ')}
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def get_similarity(query: str, text: str) -> float:
+    """
+    Gets how similar normalized text is to a query, from 0 to 1.
+
+    The query is compared with the whole text, and with each run of words in the
+    text that has as many words as the query. The best ratio is returned.
+
+    :param query: The normalized query.
+    :param text: The normalized text.
+    """
+    words = text.split()
+    length = len(query.split())
+    pieces = [text] + [' '.join(words[i:i + length]) for i in range(len(words) - length + 1)]
+
+    return max(SequenceMatcher(None, query, piece).ratio() for piece in pieces)
+
+
+class SuggestionIndex:
+    """
+    A thread safe in memory index for suggesting objects while the user types.
+
+    Each object is stored by a key with a list of texts, like its name. The texts
+    are indexed by their trigrams, so a fragment of a text can be found without
+    scanning every text. Fragments shorter than three characters are matched
+    against the start of the words in the texts instead.
+
+    Mistyped queries are found by ``search_similar``, which finds the objects that
+    share the most padded trigrams with the query, then ranks them by how similar
+    their texts are.
+
+    The index is loaded the first time it is searched. After that, it is updated
+    every ``refresh_interval`` seconds with the objects that changed since it was
+    last loaded, so objects changed by other processes are found too.
+
+    :param load: A callable that takes a datetime, or None to load everything, and
+                 returns (key, texts) pairs for the objects that changed since then.
+    :param refresh_interval: The seconds between updates.
+    """
+
+    def __init__(self, load: t.Callable, refresh_interval: float=60):
+        self.load = load
+        self.refresh_interval = refresh_interval
+        self._texts = {}
+        self._sizes = {}
+        self._trigrams = {}
+        self._prefixes = {}
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._refreshed_at = None
+
+    def refresh(self):
+        """Loads the index if it has not been loaded, or updates it if it is time to."""
+        with self._lock:
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return
+
+            # objects saved while the last load was running may have an older
+            # last modified date, so the interval before it is loaded again.
+            since = None
+            if self._loaded_at is not None:
+                since = self._loaded_at - timedelta(seconds=self.refresh_interval)
+
+            loaded_at = datetime.now()
+            for key, texts in self.load(since):
+                self.add(key, texts)
+
+            self._loaded_at = loaded_at
+            self._refreshed_at = time.monotonic()
+
+    def add(self, key, texts: list[str]):
+        """
+        Adds an object to the index, or updates it if it is already in it.
+
+        :param key: The key of the object.
+        :param texts: The texts to find the object by. Texts that are None are left out.
+        """
+        texts = [normalize(text) for text in texts if text is not None]
+
+        with self._lock:
+            self.remove(key)
+            self._texts[key] = texts
+            self._sizes[key] = len(set().union(*[get_trigrams(text, padded=True) for text in texts]))
+
+            for text in texts:
+                for trigram in get_trigrams(text) | get_trigrams(text, padded=True):
+                    self._trigrams.setdefault(trigram, set()).add(key)
+
+                for word in text.split():
+                    for prefix in [word[:1], word[:2]]:
+                        self._prefixes.setdefault(prefix, set()).add(key)
+
+    def remove(self, key):
+        """
+        Removes an object from the index. Nothing happens if it is not in the index.
+
+        :param key: The key of the object.
+        """
+        with self._lock:
+            texts = self._texts.pop(key, None)
+            if texts is None:
+                return
+
+            del self._sizes[key]
+
+            for text in texts:
+                pieces = [
+                    (self._trigrams, trigram)
+                    for trigram in get_trigrams(text) | get_trigrams(text, padded=True)
+                ]
+                for word in text.split():
+                    pieces.extend([(self._prefixes, word[:1]), (self._prefixes, word[:2])])
+
+                for mapping, piece in pieces:
+                    keys = mapping.get(piece)
+                    if keys is None:
+                        continue
+
+                    keys.discard(key)
+                    if len(keys) == 0:
+                        del mapping[piece]
+
+    def get_rank(self, key, query: str):
+        """
+        Gets how well an object matches a normalized query, lower is better.
+
+        Exact matches come first, then texts that start with the query, then texts
+        with a word that starts with it, then texts that contain it. None is
+        returned if no text contains the query.
+
+        :param key: The key of the object.
+        :param query: The normalized query.
+        """
+        ranks = []
+        for text in self._texts[key]:
+            if text == query:
+                ranks.append(0)
+            elif text.startswith(query):
+                ranks.append(1)
+            elif f' {query}' in text:
+                ranks.append(2)
+            elif query in text:
+                ranks.append(3)
+
+        if ranks == []:
+            return None
+
+        return (min(ranks), len(self._texts[key][0]), self._texts[key][0])
+
+    def search(self, query: str, limit: int=10) -> list:
+        """
+        Gets the keys of the objects that best match the query.
+
+        :param query: What the user typed.
+        :param limit: The max amount of keys to return.
+        """
+        self.refresh()
+
+        query = normalize(query)
+        if query == '':
+            return []
+
+        with self._lock:
+            if len(query) < 3:
+                candidates = self._prefixes.get(query, set())
+            else:
+                # the smallest sets are intersected first, so the work stays small
+                posting_sets = sorted(
+                    (self._trigrams.get(trigram, set()) for trigram in get_trigrams(query)),
+                    key=len,
+                )
+                candidates = set(posting_sets[0]).intersection(*posting_sets[1:])
+
+            ranked = []
+            for key in candidates:
+                rank = self.get_rank(key, query)
+                if rank is not None:
+                    ranked.append((rank, key))
+
+        return [key for rank, key in heapq.nsmallest(limit, ranked, key=lambda item: item[0])]
+
+    def search_similar(self, query: str, limit: int=10, min_similarity: float=0.6) -> list:
+        """
+        Gets the keys of the objects whose texts are most similar to the query.
+
+        This finds objects when the user mistyped what they were looking for, like
+        "pyhton" for "python". (key, similarity) tuples are returned, most similar first.
+
+        :param query: What the user typed.
+        :param limit: The max amount of keys to return.
+        :param min_similarity: How similar, from 0 to 1, a text has to be to the query.
+        """
+        self.refresh()
+
+        query = normalize(query)
+        if query == '':
+            return []
+
+        query_trigrams = get_trigrams(query, padded=True)
+
+        with self._lock:
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+
+            # the objects that share the biggest part of their trigrams with the query are
+            # compared with it, so the slow comparison is only done for a few objects.
+            candidates = heapq.nlargest(
+                limit * 10,
+                shared.items(),
+                key=lambda item: item[1] / (len(query_trigrams) + self._sizes[item[0]] - item[1]),
+            )
+
+            ranked = []
+            for key, count in candidates:
+                similarity = max(get_similarity(query, text) for text in self._texts[key])
+                if similarity >= min_similarity:
+                    ranked.append((-similarity, len(self._texts[key][0]), self._texts[key][0], key))
+
+        return [(key, -similarity) for similarity, length, text, key in sorted(ranked)[:limit]]
+
+    def __len__(self):
+        return len(self._texts)
@@ -1,7 +1,108 @@
-from flask import request, abort, render_template, g, redirect, flash
-
+from flask import (
+    request,
+    abort,
+    render_template,
+    g,
+    redirect,
+    flash,
+    current_app,
+    make_response,
+)
+from werkzeug.http import is_resource_modified
+from datetime import datetime
+
+import hashlib
+import json
 import math
 
+
+def db_free(view_func):
+    """
+    A decorator that marks a view function as not using the database.
+
+    Requests to DB-free views never open a database connection. ``g.user`` is
+    only looked up in the session cache for them.
+    """
+    view_func.db_free = True
+    return view_func
+
+
+def is_db_free_request() -> bool:
+    """
+    Checks if the current request is for a DB-free view.
+
+    Requests are DB-free if their view or its blueprint has a true ``db_free``
+    attribute. Static files and requests that do not match a route are always
+    DB-free.
+    """
+    if request.endpoint is None or request.endpoint.split('.')[-1] == 'static':
+        return True
+
+    blueprint = current_app.blueprints.get(request.blueprint)
+    if getattr(blueprint, 'db_free', False):
+        return True
+
+    view_func = current_app.view_functions.get(request.endpoint)
+    return getattr(view_func, 'db_free', False)
+
+
+def make_etag(*parts) -> str:
+    """
+    Makes an ETag from the given parts.
+
+    The parts have to be json serializable, dates are turned into strings.
+    """
+    data = json.dumps(parts, default=str)
+    return hashlib.sha256(data.encode('utf8')).hexdigest()
+
+
+def is_not_modified(etag: str=None, last_modified: datetime=None) -> bool:
+    """
+    Checks if the client already has the current version of the requested resource.
+
+    The ``If-None-Match`` and ``If-Modified-Since`` headers of the request are
+    compared with the given ETag and last modified date.
+
+    :param etag: The resource's ETag.
+    :param last_modified: When the resource was last modified.
+    """
+    return is_resource_modified(
+        request.environ,
+        etag=etag,
+        last_modified=last_modified,
+    ) is False
+
+
+def set_validators(response, etag: str=None, last_modified: datetime=None):
+    """
+    Adds the ``ETag`` and ``Last-Modified`` headers to a response, and returns the response.
+
+    :param response: The response.
+    :param etag: The resource's ETag.
+    :param last_modified: When the resource was last modified.
+    """
+    if etag is not None:
+        response.set_etag(etag)
+
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    return response
+
+
+def not_modified(etag: str=None, last_modified: datetime=None, vary: list[str]=None):
+    """
+    Makes a 304 response.
+
+    :param etag: The resource's ETag.
+    :param last_modified: When the resource was last modified.
+    :param vary: The request headers the resource depends on, for the ``Vary`` header.
+    """
+    response = set_validators(make_response('', 304), etag, last_modified)
+    response.vary.update(vary or [])
+    return response
+
+
 class View:
     """
     A class for creating views.
@@ -15,6 +116,9 @@ class View:
         'get',
         'post',
     ]
+
+    # if this is true, the view is marked as not using the database
+    db_free = False
     
     @classmethod
     def as_view(cls):
@@ -23,6 +127,7 @@ class View:
         def view(**kwargs):
             self = cls()
             return self.on_request(**kwargs)
+        view.db_free = cls.db_free
         return view
 
     def on_request(self, **kwargs):
@@ -171,6 +276,47 @@ class FormView(FormMixin, TemplateMixin, View):
             return self.form_invalid(form, **kwargs)
 
 
+class ConditionalMixin:
+    """
+    A mixin for answering conditional GET requests.
+
+    ``get_etag`` and ``get_last_modified`` are called before the request method's
+    handler. If the client already has the current version, a 304 response is
+    returned without calling the handler, otherwise the headers are added to its
+    response. They should be cheap, since they run on every request.
+
+    ``vary`` is the request headers the ETag depends on. They are sent in the
+    ``Vary`` header of both responses.
+    """
+
+    vary = []
+
+    def get_etag(self, **kwargs):
+        """Gets the ETag of the resource, or None if it does not have one."""
+        return None
+
+    def get_last_modified(self, **kwargs):
+        """Gets when the resource was last modified, or None if it is not known."""
+        return None
+
+    def on_request(self, **kwargs):
+        if request.method not in ['GET', 'HEAD']:
+            return super().on_request(**kwargs)
+
+        etag = self.get_etag(**kwargs)
+        last_modified = self.get_last_modified(**kwargs)
+
+        if (etag is not None or last_modified is not None) and is_not_modified(etag, last_modified):
+            return not_modified(etag, last_modified, self.vary)
+
+        response = make_response(super().on_request(**kwargs))
+        if response.status_code != 200:
+            return response
+
+        response.vary.update(self.vary)
+        return set_validators(response, etag, last_modified)
+
+
 class AuthenticationRequiredMixin:
     """A mixin for only allowing authenticated user."""
 
@@ -10,9 +10,10 @@ from peewee import (
 from installies.models.base import BaseModel
 from installies.models.user import User
 from installies.models.maintainer import Maintainers
-from installies.config import database, apps_path
+from installies.config import database, apps_path, suggest_refresh_interval
 from installies.lib.url import make_slug
 from installies.lib.random import gen_random_id
+from installies.lib.suggest import SuggestionIndex
 from datetime import datetime
 
 import json
@@ -33,6 +34,65 @@ class App(BaseModel):
     submitter = ForeignKeyField(User, backref='apps')
     maintainers = ForeignKeyField(Maintainers)
     
+    @classmethod
+    def get_suggestion_texts(cls, since: datetime=None):
+        """
+        Gets the names and display names of the apps for the suggestion index.
+
+        :param since: Only the apps modified since then are returned, or all of them if it is None.
+        """
+        query = cls.select(cls.id, cls.name, cls.display_name)
+        if since is not None:
+            query = query.where(cls.last_modified >= since)
+
+        for app_id, name, display_name in query.tuples().iterator():
+            yield app_id, [name, display_name]
+
+    @classmethod
+    def suggest(cls, query: str, limit: int=10) -> list:
+        """
+        Gets the apps whose name or display name best match what the user typed.
+
+        The apps are found in the suggestion index, then loaded by their ids, so
+        apps that were deleted by other processes are left out.
+
+        :param query: What the user typed.
+        :param limit: The max amount of apps to return.
+        """
+        # extra apps are found, in case some of them were deleted. If nothing contains
+        # what the user typed, it may be mistyped, so similar apps are suggested.
+        app_ids = suggestion_index.search(query, limit * 2)
+        if app_ids == []:
+            app_ids = cls.get_similar_ids(query, limit * 2)
+
+        if app_ids == []:
+            return []
+
+        apps = {
+            app.id: app for app in
+            cls.select(cls.id, cls.name, cls.display_name).where(cls.id.in_(app_ids))
+        }
+
+        for app_id in app_ids:
+            if app_id not in apps:
+                suggestion_index.remove(app_id)
+
+        return [apps[app_id] for app_id in app_ids if app_id in apps][:limit]
+
+    @classmethod
+    def get_similar_ids(cls, query: str, limit: int=50) -> list[int]:
+        """
+        Gets the ids of the apps whose name or display name is similar to what the user typed.
+
+        This finds apps when the user mistyped their names. The ids are ordered from the most
+        similar app to the least. Apps deleted by other processes may be in the list, so the
+        ids should be used to filter a query.
+
+        :param query: What the user typed.
+        :param limit: The max amount of ids to return.
+        """
+        return [app_id for app_id, similarity in suggestion_index.search_similar(query, limit)]
+
     @classmethod
     def create(
             cls,
@@ -65,6 +125,8 @@ class App(BaseModel):
         )
 
         maintainers.add_maintainer(submitter)
+
+        suggestion_index.add(app.id, [app.name, app.display_name])
         
         return app
 
@@ -113,6 +175,8 @@ class App(BaseModel):
 
         self.save()
 
+        suggestion_index.add(self.id, [self.name, self.display_name])
+
     def delete_instance(self):
         """Delete the app and all of its scripts."""
 
@@ -127,6 +191,8 @@ class App(BaseModel):
         
         super().delete_instance()
 
+        suggestion_index.remove(self.id)
+
         self.maintainers.delete_instance()
 
     def can_user_edit(self, user: User):
@@ -143,3 +209,7 @@ class App(BaseModel):
             return True
 
         return False
+
+
+# the apps' names and display names, for suggesting apps while the user types
+suggestion_index = SuggestionIndex(App.get_suggestion_texts, suggest_refresh_interval)
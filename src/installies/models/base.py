@@ -25,3 +25,9 @@ class BaseModel(Model):
         """Meta data for the BaseModel."""
 
         database = database
+
+
+class LongTextField(TextField):
+    """A text field that is a LONGTEXT on MySQL, where a TEXT can only hold 64KB."""
+
+    field_type = 'LONGTEXT'
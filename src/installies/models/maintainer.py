@@ -8,6 +8,58 @@ from installies.models.user import User
 class Maintainers(BaseModel):
     """A junction model between Maintainer models and maintainable objects."""
 
+    @classmethod
+    def prefetch(cls, group_ids) -> dict:
+        """
+        Gets Maintainers objects with their maintainers and the maintainers' users loaded.
+
+        A dictionary with the ids as keys is returned. Loading them only takes one query.
+
+        :param group_ids: The ids of the Maintainers objects to get.
+        """
+        groups = {}
+        for group_id in group_ids:
+            groups[group_id] = cls(id=group_id)
+            groups[group_id].maintainers = []
+
+        if groups == {}:
+            return groups
+
+        maintainers = (
+            Maintainer
+            .select(Maintainer, User)
+            .join(User)
+            .where(Maintainer.group.in_(list(groups.keys())))
+            .order_by(Maintainer.id)
+        )
+
+        for maintainer in maintainers:
+            group = groups[maintainer.group_id]
+            maintainer.group = group
+            group.maintainers.append(maintainer)
+
+        return groups
+
+    @staticmethod
+    def get_group_ids(username: str, exact: bool=True):
+        """
+        Gets a query of the ids of the Maintainers objects a user is in.
+
+        The query can be used in a where clause, like ``App.maintainers.in_(...)``,
+        so objects maintained by a user can be found without joining and DISTINCT.
+
+        :param username: The user's username.
+        :param exact: If false, the groups of every user whose username contains it are found.
+        """
+        condition = (User.username == username if exact else User.username.contains(username))
+
+        return (
+            Maintainer
+            .select(Maintainer.group)
+            .join(User)
+            .where(condition)
+        )
+
     def get_maintainers(self):
         """
         Gets all the maintainers.
@@ -19,10 +71,11 @@ class Maintainers(BaseModel):
         """
         Adds a maintainer.
 
-        Returns the new Maintainer object.
+        Returns the new Maintainer object. If the user is already a maintainer,
+        their Maintainer object is returned instead.
         """
 
-        maintainer = Maintainer.create(user=user, group=self)
+        maintainer, created = Maintainer.get_or_create(user=user, group=self)
 
         return maintainer
 
@@ -33,18 +86,21 @@ class Maintainers(BaseModel):
         If the given user is not a maintainer, nothing happens.
         """
 
-        if self.is_maintainer(user):
-            maintainer = (
-                Maintainer.select()
-                .where(Maintainer.user == user)
-                .where(Maintainer.group == self)
-                .get()
-            )
-            maintainer.delete_instance()
+        (
+            Maintainer
+            .delete()
+            .where(Maintainer.user == user)
+            .where(Maintainer.group == self)
+            .execute()
+        )
 
     def is_maintainer(self, user: User):
         """Checks if the given user is a maintainer."""
 
+        # if the maintainers have been prefetched, they are checked without a query
+        if isinstance(self.__dict__.get('maintainers'), list):
+            return any(maintainer.user_id == user.id for maintainer in self.maintainers)
+
         maintainer = (
             Maintainer
             .select()
@@ -63,3 +119,9 @@ class Maintainer(BaseModel):
 
     user = ForeignKeyField(User, backref="maintains")
     group = ForeignKeyField(Maintainers, backref="maintainers", on_delete='CASCADE')
+
+    class Meta:
+        # finding the groups of a user only reads the index
+        indexes = (
+            (('user', 'group'), True),
+        )
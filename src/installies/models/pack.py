@@ -0,0 +1,15 @@
+from peewee import (
+    CharField,
+    IntegerField,
+    BigIntegerField,
+)
+from installies.models.base import BaseModel
+
+
+class PackEntry(BaseModel):
+    """A model for storing where data is in the pack files."""
+
+    key = CharField(128, primary_key=True)
+    segment = IntegerField(index=True)
+    offset = BigIntegerField()
+    length = IntegerField()
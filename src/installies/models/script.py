@@ -5,30 +5,209 @@ from peewee import (
     DateTimeField,
     BooleanField,
     TextField,
+    IntegerField,
     ForeignKeyField,
+    IntegrityError,
     JOIN,
 )
-from installies.models.base import BaseModel
+from installies.models.base import BaseModel, LongTextField
 from installies.models.user import User
 from installies.models.app import App
 from installies.models.maintainer import Maintainers
-from installies.models.discussion import Thread
-from installies.config import database, apps_path
+from installies.models.discussion import Thread, Comment
+from installies.config import database, database_engine, apps_path
 from installies.lib.url import make_slug
-from installies.lib.random import gen_random_id
 from installies.lib.shell import Shell
+from installies.storage import storage
+from installies.lib.delta import make_delta, apply_delta
 from datetime import datetime
 
+import difflib
+import gzip
+import hashlib
+import io
 import json
 import os
 import string
 import random
 import bleach
 
+
 class ScriptNotFound(Exception):
     """An exception to raise when an app cannot be found."""
 
 
+class ScriptBlob(BaseModel):
+    """
+    A model for storing script content by its SHA-256 hash.
+
+    Scripts with the same content share one blob, so the content is only stored once.
+    Blobs store both the content scripts are uploaded with, and their built artifacts.
+    The refcount is the amount of references to the blob from scripts. Blobs whose
+    refcount reaches 0 are kept until they are collected.
+    """
+
+    hash = CharField(64, primary_key=True)
+    size = IntegerField()
+    refcount = IntegerField(default=0)
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """
+        Gets the SHA-256 hash of the content.
+
+        :param content: The content to hash.
+        """
+        return hashlib.sha256(content.encode('utf8')).hexdigest()
+
+    @staticmethod
+    def get_path(content_hash: str, directory: str=apps_path) -> str:
+        """
+        Gets the path of the file that stores the content with the given hash.
+
+        The files are spread over folders named after the first two pairs of
+        characters of the hash, so no folder gets too many files.
+
+        :param content_hash: The hash of the content.
+        :param directory: The directory the blobs are stored in.
+        """
+        return os.path.join(directory, 'blobs', content_hash[0:2], content_hash[2:4], content_hash)
+
+    @property
+    def filepath(self) -> str:
+        """The path of the blob's file."""
+        return self.get_path(self.hash)
+
+    @staticmethod
+    def get_key(content_hash: str, compressed: bool=False) -> str:
+        """
+        Gets the key the content with the given hash is stored by in the storage.
+
+        :param content_hash: The hash of the content.
+        :param compressed: If true, the key of the gzip compressed copy is returned.
+        """
+        return (f'{content_hash}.gz' if compressed else content_hash)
+
+    @classmethod
+    def put_data(cls, content: str, compress: bool=False) -> str:
+        """
+        Stores the content's data without adding a reference to its blob, and returns its hash.
+
+        This is used to write the data before the transaction that stores the blob, so the
+        data is on disk before any row points to it.
+
+        :param content: The content to store.
+        :param compress: If true, a gzip compressed copy of the content is stored next to it.
+        """
+        content_hash = cls.hash_content(content)
+        data = content.encode('utf8')
+
+        storage.put(content_hash, data)
+        if compress:
+            storage.put(cls.get_key(content_hash, compressed=True), gzip.compress(data, mtime=0))
+
+        return content_hash
+
+    @classmethod
+    def store(cls, content: str, compress: bool=False):
+        """
+        Stores the content, and adds a reference to its blob.
+
+        If a blob with the same content already exists, its refcount is
+        increased instead of writing the content again. The blob is returned.
+
+        :param content: The content to store.
+        :param compress: If true, a gzip compressed copy of the content is stored next to it.
+        """
+        # the content is stored before the row is created, so a blob never
+        # exists without its content.
+        content_hash = cls.put_data(content, compress)
+
+        while True:
+            updated = (
+                cls
+                .update(refcount=cls.refcount + 1)
+                .where(cls.hash == content_hash)
+                .execute()
+            )
+            if updated != 0:
+                break
+
+            try:
+                with database.atomic():
+                    cls.insert(
+                        hash=content_hash,
+                        size=len(content.encode('utf8')),
+                        refcount=1,
+                    ).execute()
+                break
+            except IntegrityError:
+                # another request created the blob first, so its refcount is increased instead
+                continue
+
+        # the blob may have been collected after its content was stored, but before its
+        # refcount was increased, so the content is stored again if it is missing. A blob
+        # with references is never collected, so the content stays after this.
+        cls.put_data(content, compress)
+
+        return cls.get_by_id(content_hash)
+
+    @classmethod
+    def release(cls, content_hash: str):
+        """
+        Removes a reference to a blob.
+
+        Blobs no scripts use are not deleted here, since another request may be storing the
+        same content. They are deleted by ``collect``.
+
+        :param content_hash: The hash of the blob.
+        """
+        (
+            cls
+            .update(refcount=cls.refcount - 1)
+            .where(cls.hash == content_hash)
+            .execute()
+        )
+
+    @classmethod
+    def collect(cls) -> int:
+        """
+        Deletes the blobs that no scripts use, along with their data, and returns the amount deleted.
+
+        Each blob is deleted in its own transaction, and its data is deleted before the
+        transaction is committed. A request storing the same content waits for the row
+        until then, and stores the content again. In an outer transaction, the blobs would
+        only be savepoints, so it has to be called outside of one.
+        """
+        if database.in_transaction():
+            raise RuntimeError('Unused blobs cannot be collected in a transaction.')
+
+        collected = 0
+        unused_hashes = [
+            blob.hash for blob in cls.select(cls.hash).where(cls.refcount <= 0)
+        ]
+
+        for content_hash in unused_hashes:
+            with database.atomic():
+                deleted = (
+                    cls
+                    .delete()
+                    .where((cls.hash == content_hash) & (cls.refcount <= 0))
+                    .execute()
+                )
+
+                if deleted != 0:
+                    storage.delete(content_hash)
+                    storage.delete(cls.get_key(content_hash, compressed=True))
+                    collected += 1
+
+        return collected
+
+    def verify(self) -> bool:
+        """Checks that the blob's stored content still has the hash it is stored by."""
+        return self.hash_content(storage.get(self.hash).decode('utf8')) == self.hash
+
+
 class Script(BaseModel):
     """A model for storing data about scripts."""
 
@@ -39,6 +218,13 @@ class Script(BaseModel):
     description = CharField(255)
 
     filepath = CharField(255)
+    blob = ForeignKeyField(ScriptBlob, backref='scripts', null=True, column_name='content_hash')
+    artifact = ForeignKeyField(
+        ScriptBlob,
+        backref='artifact_scripts',
+        null=True,
+        column_name='artifact_hash',
+    )
     shell = CharField(255)
     use_default_function_matcher = BooleanField(default=True)
 
@@ -47,43 +233,54 @@ class Script(BaseModel):
     app = ForeignKeyField(App, backref='scripts')
     thread = ForeignKeyField(Thread, backref='for_script')
     
-    def open_content(self, mode='r'):
-        """
-        Get the content of the script.
+    def open_content(self):
+        """Get the content of the script as a file object."""
+        return io.StringIO(self.get_content())
 
-        :param mode: The mode to open the content in.
+    def get_content(self) -> str:
         """
-        return open(self.filepath, mode)
+        Get the content of the script as a string.
 
-    @classmethod
-    def create_script_file(cls, directory: str, content: str):
+        The content is only read from the file once, after that it is kept on the script object.
         """
-        Create a file to store the data for the script.
+        if '_content' not in self.__dict__:
+            if self.content_hash is not None:
+                self._content = storage.get(self.content_hash).decode('utf8')
+            else:
+                with open(self.filepath) as f:
+                    self._content = f.read()
 
-        The path is returned.
+        return self._content
 
-        :param directory: The directory to put the script in.
-        :param content: The content of the script.
+    @property
+    def content_hash(self):
         """
-        script_filename = ''
-        script_path = ''
+        The SHA-256 hash of the script's content.
 
-        # since script file names are randomly generated there is a slight
-        # chance that it generates the name of a script file that already
-        # exists.
-        while True:
-            script_filename = f'script-{gen_random_id()}'
+        Scripts uploaded before content was stored by its hash do not have one, so None is returned.
+        """
+        return self.blob_id
 
-            script_path = os.path.join(directory, script_filename)
+    @property
+    def artifact_hash(self):
+        """
+        The SHA-256 hash of the script's artifact.
 
-            if os.path.exists(script_path) is False:
+        None is returned if the artifact has not been built.
+        """
+        return self.artifact_id
 
-                with open(script_path, 'w') as f:
-                    f.write(content)
+    @property
+    def has_compressed_artifact(self) -> bool:
+        """
+        Checks if the script's artifact has a gzip compressed copy.
 
-                break
+        Artifacts built before they were compressed do not have one.
+        """
+        if self.artifact_hash is None:
+            return False
 
-        return script_path
+        return storage.exists(ScriptBlob.get_key(self.artifact_hash, compressed=True))
 
     @classmethod
     def create(
@@ -111,31 +308,41 @@ class Script(BaseModel):
         :param use_default_function_matcher: A boolean to mark if the
             script uses the function to action matcher.
         """
-        thread = Thread.create(
-            title=f'Discussion of script: "{description}"',
-            creator=None,
-            app=app,
-        )
-        
-        filepath = cls.create_script_file(apps_path, content)
+        # the content is stored before the transaction, and the rows are committed together,
+        # so a failure never leaves the script half created.
+        ScriptBlob.put_data(content)
+
+        with database.atomic():
+            thread = Thread.create(
+                title=f'Discussion of script: "{description}"',
+                creator=None,
+                app=app,
+            )
 
-        maintainers = Maintainers.create()
-        
-        created_script = super().create(
-            maintainers=maintainers,
-            submitter=submitter,
-            filepath=filepath,
-            description=description,
-            shell=shell,
-            app=app,
-            version=version,
-            use_default_function_matcher=use_default_function_matcher,
-            thread=thread,
-        )
+            blob = ScriptBlob.store(content)
+
+            maintainers = Maintainers.create()
+
+            created_script = super().create(
+                maintainers=maintainers,
+                submitter=submitter,
+                filepath=blob.filepath,
+                blob=blob,
+                description=description,
+                shell=shell,
+                app=app,
+                version=version,
+                use_default_function_matcher=use_default_function_matcher,
+                thread=thread,
+            )
+
+            actions = Action.create_from_list(created_script, actions)
+
+            created_script.build_artifact()
 
-        actions = Action.create_from_list(created_script, actions)
+            ScriptRevision.record(created_script, content, editor=submitter)
 
-        maintainers.add_maintainer(submitter)
+            maintainers.add_maintainer(submitter)
 
         return created_script
 
@@ -147,6 +354,7 @@ class Script(BaseModel):
             actions: list[str],
             version=None,
             use_default_function_matcher: bool=True,
+            editor: User=None,
     ):
         """
         Edits the script.
@@ -158,27 +366,44 @@ class Script(BaseModel):
         :param version: The version of the app the script is for.
         :param use_default_function_matcher: A boolean to mark if the
             script uses the function to action matcher.
+        :param editor: The user who edited the script.
         """
 
-        self.thread.title = f'Discussion of script: "{description}"'
-        self.thread.save()
+        # the content is stored before the transaction, and the content, actions, revision,
+        # and artifact are committed together, so a failure never leaves them out of step.
+        ScriptBlob.put_data(content)
 
-        self.last_modified = datetime.today()
+        with database.atomic():
+            self.thread.title = f'Discussion of script: "{description}"'
+            self.thread.save()
 
-        self.description = description
-        self.shell = shell
+            self.last_modified = datetime.today()
 
-        self.version = version
-        self.use_default_function_matcher = use_default_function_matcher
-        self.save()
+            self.description = description
+            self.shell = shell
 
-        with self.open_content('w') as f:
-            f.write(content)
+            self.version = version
+            self.use_default_function_matcher = use_default_function_matcher
 
-        Action.delete().where(Action.script == self).execute()
-        Action.create_from_list(self, actions)
+            # the content is only stored again if it changed
+            if ScriptBlob.hash_content(content) != self.content_hash:
+                # scripts created before revisions were kept get their current content as the first one
+                if self.revisions.exists() is False:
+                    ScriptRevision.record(self, self.get_content())
 
-        self.save()
+                self.set_content(content)
+                ScriptRevision.record(self, content, editor=editor)
+            else:
+                self.save()
+            self._content = content
+
+            Action.delete().where(Action.script == self).execute()
+
+            # the actions may have been loaded before, so the new ones replace them
+            self.actions = Action.create_from_list(self, actions)
+
+            # the artifact depends on the content, shell, and actions, so it is always rebuilt
+            self.build_artifact()
 
     def delete_instance(self):
         """Deletes the script and its related objects."""
@@ -189,11 +414,52 @@ class Script(BaseModel):
         super().delete_instance()
 
         self.thread.delete_instance()
-        
-        os.remove(self.filepath)
 
-    def serialize(self):
-        """Turns the Script into a json serializable dict."""
+        self.remove_content(self.content_hash, self.filepath)
+
+        if self.artifact_hash is not None:
+            ScriptBlob.release(self.artifact_hash)
+
+    def set_content(self, content: str):
+        """
+        Stores new content for the script, and saves it.
+
+        The old content is removed after the script is saved, so the script never points to
+        content that does not exist.
+
+        :param content: The new content.
+        """
+        old_content_hash = self.content_hash
+        old_filepath = self.filepath
+
+        blob = ScriptBlob.store(content)
+        self.blob = blob
+        self.filepath = blob.filepath
+        self.save()
+
+        self.remove_content(old_content_hash, old_filepath)
+
+    @staticmethod
+    def remove_content(content_hash: str, filepath: str):
+        """
+        Removes a reference to a script's content.
+
+        Content that is not stored by its hash has its file deleted instead.
+
+        :param content_hash: The hash of the content, or None if it is not stored by its hash.
+        :param filepath: The path of the content's file.
+        """
+        if content_hash is not None:
+            ScriptBlob.release(content_hash)
+        elif os.path.exists(filepath):
+            os.remove(filepath)
+
+    def serialize(self, include_content: bool=True):
+        """
+        Turns the Script into a json serializable dict.
+
+        :param include_content: If false, the content is left out, and the script's file is not read.
+        """
         data = {}
 
         data['id'] = self.id
@@ -201,16 +467,14 @@ class Script(BaseModel):
         data['supported_distros'] = self.get_supported_distros_as_dict()
         data['creation_date'] = str(self.creation_date)
         data['last_modified'] = str(self.last_modified)
-        
-        with self.open_content() as c:
-            data['content'] = c.read()
-        
         data['submitter'] = self.submitter.username
         data['description'] = self.description
 
         data['actions'] = [action.name for action in self.actions]
         data['for_version'] = self.version
-        data['content'] = self.complete_content()
+
+        if include_content:
+            data['content'] = self.complete_content()
 
         return data
 
@@ -289,12 +553,11 @@ class Script(BaseModel):
         
         return content + matcher
     
-    def complete_content(self):
+    def build_complete_content(self) -> str:
         """
         Adds the stuff to the script's content to make it working, returns the content.
         """
-        with self.open_content() as f:
-            new_content = f.read()
+        new_content = self.get_content()
 
         shell = Shell.get_shell_by_name(self.shell)
 
@@ -307,6 +570,61 @@ class Script(BaseModel):
 
         return new_content
 
+    def build_artifact(self):
+        """
+        Builds the script's artifact, the complete content that is downloaded, and saves the script.
+
+        The artifact is stored as a blob with a gzip compressed copy, so it only has to be
+        built and compressed when the script changes, instead of every time it is downloaded.
+        """
+        old_artifact_hash = self.artifact_hash
+
+        self._complete_content = self.build_complete_content()
+        self.artifact = ScriptBlob.store(self._complete_content, compress=True)
+
+        # downloads are checked with If-Modified-Since too, so a changed artifact is a newer script
+        if old_artifact_hash is not None and self.artifact_hash != old_artifact_hash:
+            self.last_modified = datetime.now()
+
+        self.save()
+
+        if old_artifact_hash is not None:
+            ScriptBlob.release(old_artifact_hash)
+
+    def complete_content(self) -> str:
+        """
+        Gets the content of the script's artifact.
+
+        If the artifact has not been built, the complete content is built instead.
+        """
+        if '_complete_content' not in self.__dict__:
+            if self.artifact_hash is None:
+                self._complete_content = self.build_complete_content()
+            else:
+                self._complete_content = storage.get(self.artifact_hash).decode('utf8')
+
+        return self._complete_content
+
+    def get_latest_comments(self, limit: int=10) -> list:
+        """
+        Gets the first comments of the script's discussion, with their creators.
+
+        They are only loaded once, after that they are kept on the script object.
+
+        :param limit: The max amount of comments.
+        """
+        if '_latest_comments' not in self.__dict__:
+            self._latest_comments = list(
+                Comment
+                .select(Comment, User)
+                .join(User)
+                .where(Comment.thread == self.thread_id)
+                .order_by(Comment.id)
+                .limit(limit)
+            )
+
+        return self._latest_comments
+
     def get_supported_actions(self):
         """Get the actions the script supports in a list."""
         return [action.name for action in self.actions]
@@ -327,3 +645,135 @@ class Action(BaseModel):
             action_objects.append(Action.create(name=action, script=script))
 
         return action_objects
+
+
+class ScriptRevision(BaseModel):
+    """
+    A model for storing a revision of a script's content.
+
+    Every ``SNAPSHOT_INTERVAL`` revisions, the full content is stored as a
+    snapshot. The revisions in between only store a delta from the revision
+    before them, so getting the content of a revision never applies more than
+    ``SNAPSHOT_INTERVAL - 1`` deltas.
+    """
+
+    SNAPSHOT_INTERVAL = 16
+
+    script = ForeignKeyField(Script, backref='revisions', on_delete='CASCADE')
+    number = IntegerField()
+    editor = ForeignKeyField(User, backref='script_revisions', null=True)
+    creation_date = DateTimeField(default=datetime.now)
+
+    content_hash = CharField(64)
+    size = IntegerField()
+    is_snapshot = BooleanField()
+    data = LongTextField()
+
+    class Meta:
+        indexes = (
+            (('script', 'number'), True),
+        )
+
+    @classmethod
+    def record(cls, script: Script, content: str, editor: User=None):
+        """
+        Adds a revision to the script, and returns it.
+
+        If the content is the same as the latest revision's, no revision is added,
+        and the latest revision is returned. It has to be called in a transaction.
+
+        :param script: The script.
+        :param content: The script's new content.
+        :param editor: The user who changed the content.
+        """
+        content_hash = ScriptBlob.hash_content(content)
+
+        latest = (
+            cls
+            .select()
+            .where(cls.script == script)
+            .order_by(cls.number.desc())
+        )
+
+        # concurrent edits would give their revisions the same number, so the script is
+        # locked until the transaction ends. SQLite only lets one transaction write at a time.
+        if database_engine == 'mysql':
+            Script.select(Script.id).where(Script.id == script.id).for_update().execute()
+            latest = latest.for_update()
+
+        latest = latest.first()
+
+        if latest is not None and latest.content_hash == content_hash:
+            return latest
+
+        number = (latest.number + 1 if latest is not None else 1)
+
+        is_snapshot = True
+        data = content
+
+        if (number - 1) % cls.SNAPSHOT_INTERVAL != 0:
+            delta = make_delta(latest.get_content(), content)
+
+            # a delta can be bigger than the content if most of it changed
+            if len(delta) < len(content):
+                is_snapshot = False
+                data = delta
+
+        return cls.create(
+            script=script,
+            number=number,
+            editor=editor,
+            content_hash=content_hash,
+            size=len(content.encode('utf8')),
+            is_snapshot=is_snapshot,
+            data=data,
+        )
+
+    def get_content(self) -> str:
+        """
+        Gets the content of the script at this revision.
+
+        The revisions since the last snapshot are loaded with one query, and their deltas applied.
+        """
+        if self.is_snapshot:
+            return self.data
+
+        # there is always a snapshot in the last SNAPSHOT_INTERVAL revisions
+        revisions = list(
+            ScriptRevision
+            .select()
+            .where(
+                (ScriptRevision.script == self.script_id) &
+                (ScriptRevision.number <= self.number) &
+                (ScriptRevision.number > self.number - self.SNAPSHOT_INTERVAL)
+            )
+            .order_by(ScriptRevision.number)
+        )
+
+        snapshot_index = max(
+            index for index, revision in enumerate(revisions) if revision.is_snapshot
+        )
+
+        content = revisions[snapshot_index].data
+        for revision in revisions[snapshot_index + 1:]:
+            content = apply_delta(content, revision.data)
+
+        return content
+
+    def get_diff(self, other) -> str:
+        """
+        Gets a unified diff from another revision to this one.
+
+        :param other: The revision to compare with, or None to compare with an empty script.
+        """
+        old_content = (other.get_content() if other is not None else '')
+        old_name = (f'revision {other.number}' if other is not None else 'empty')
+
+        return ''.join(
+            difflib.unified_diff(
+                old_content.splitlines(keepends=True),
+                self.get_content().splitlines(keepends=True),
+                fromfile=old_name,
+                tofile=f'revision {self.number}',
+            )
+        )
@@ -5,15 +5,23 @@ from peewee import (
     BooleanField,
     DateTimeField,
     ForeignKeyField,
+    fn,
 )
 from installies.models.base import BaseModel
-from installies.config import database, apps_path
+from installies.config import (
+    database,
+    apps_path,
+    session_cache_size,
+    session_cache_ttl,
+)
 from installies.lib.random import gen_random_id, gen_random_string
 from installies.lib.url import make_slug
+from installies.lib.cache import TTLCache
 from datetime import datetime
 
 import json
 import bcrypt
+import hashlib
 import os
 import string
 import random
@@ -99,7 +107,17 @@ class User(BaseModel):
             return True
 
         return False
-    
+
+    def save(self, *args, **kwargs):
+        """Saves the user, and removes its outdated data from the session cache."""
+        result = super().save(*args, **kwargs)
+        Session.forget_user(self)
+        return result
+
+
+# a cache that maps session token hashes to the (user id, user data) of
+# their user, so authenticated requests do not need to query the session.
+session_cache = TTLCache(max_size=session_cache_size, ttl=session_cache_ttl)
 
 
 class Session(BaseModel):
@@ -123,6 +141,68 @@ class Session(BaseModel):
             token=token
         )
 
+    @classmethod
+    def hash_token(cls, token: str) -> str:
+        """
+        Hashes a session token for use as a cache key.
+
+        :param token: The session token.
+        """
+        return hashlib.sha256(token.encode('utf8')).hexdigest()
+
+    @classmethod
+    def get_user_by_token(cls, token: str, cache_only: bool=False):
+        """
+        Gets the user of a session token. None is returned if there is no session with the token,
+        or its user is banned.
+
+        The user is cached, so if the token has been used recently, no queries are made. Banned
+        users are never cached, so their sessions stop working as soon as they are banned.
+
+        :param token: The session token.
+        :param cache_only: Only look for the user in the cache, and never query the database.
+        """
+        key = cls.hash_token(token)
+
+        cached = session_cache.get(key)
+        if cached is not None:
+            return User(**cached[1])
+
+        if cache_only:
+            return None
+
+        # the ban is checked in the same query, so it does not need one of its own
+        banned = fn.EXISTS(Ban.select(Ban.id).where(Ban.user == User.id))
+        session = (
+            Session
+            .select(Session, User, banned.alias('banned'))
+            .join(User)
+            .where(Session.token == token)
+            .first()
+        )
+
+        if session is None or session.banned:
+            return None
+
+        user = session.user
+        session_cache.set(key, (user.id, dict(user.__data__)))
+
+        return user
+
+    @classmethod
+    def forget_user(cls, user: User):
+        """
+        Removes all the cached sessions of a user.
+
+        :param user: The user to remove the sessions of.
+        """
+        session_cache.delete_matching(lambda cached: cached[0] == user.id)
+
+    def delete_instance(self, *args, **kwargs):
+        """Deletes the session, and removes it from the session cache."""
+        session_cache.delete(self.hash_token(self.token))
+        return super().delete_instance(*args, **kwargs)
+
 class Ban(BaseModel):
     """A model for storing ban data."""
 
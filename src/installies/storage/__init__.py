@@ -0,0 +1,17 @@
+import os
+
+from installies.config import apps_path, script_storage, pack_segment_size
+from installies.lib.files import syncer
+from installies.storage.base import Storage, StorageStat, StorageKeyNotFound
+from installies.storage.filesystem import FileSystemStorage
+from installies.storage.memory import MemoryStorage
+from installies.storage.pack import PackStorage
+
+storage_classes = {
+    'files': lambda: FileSystemStorage(os.path.join(apps_path, 'blobs'), syncer),
+    'pack': lambda: PackStorage(os.path.join(apps_path, 'packs'), pack_segment_size, syncer),
+    'memory': lambda: MemoryStorage(),
+}
+
+# the storage script content is kept in, picked with the Storage config option
+storage = storage_classes[script_storage]()
@@ -0,0 +1,108 @@
+import typing as t
+
+from datetime import datetime
+
+
+class StorageKeyNotFound(Exception):
+    """An exception to raise when a key is not in a storage."""
+
+
+class StorageStat:
+    """
+    Information about data in a storage.
+
+    :param size: The size of the data in bytes.
+    :param modified: When the data was stored, or None if the storage does not know.
+    """
+
+    def __init__(self, size: int, modified: datetime=None):
+        self.size = size
+        self.modified = modified
+
+
+class Storage:
+    """
+    A base class for storages, which store data by key.
+
+    Storages are where script content is kept. Data stored by a key is never
+    changed, it can only be deleted, so keys should be made from the data, like
+    its hash.
+    """
+
+    def put(self, key: str, data: bytes):
+        """
+        Stores data by its key. Nothing happens if the key is already stored.
+
+        :param key: The key.
+        :param data: The data.
+        """
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """
+        Gets the data stored by a key.
+
+        ``StorageKeyNotFound`` is raised if the key is not stored.
+
+        :param key: The key.
+        """
+        raise NotImplementedError
+
+    def stream(self, key: str, chunk_size: int=65536) -> t.Iterator[bytes]:
+        """
+        Gets the data stored by a key in chunks.
+
+        ``StorageKeyNotFound`` is raised if the key is not stored.
+
+        :param key: The key.
+        :param chunk_size: The max size of each chunk.
+        """
+        data = self.get(key)
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def delete(self, key: str):
+        """
+        Deletes the data stored by a key. Nothing happens if the key is not stored.
+
+        :param key: The key.
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """
+        Checks if a key is stored.
+
+        :param key: The key.
+        """
+        raise NotImplementedError
+
+    def stat(self, key: str) -> StorageStat:
+        """
+        Gets information about the data stored by a key.
+
+        ``StorageKeyNotFound`` is raised if the key is not stored.
+
+        :param key: The key.
+        """
+        raise NotImplementedError
+
+    def preload(self, keys: list[str]):
+        """
+        Loads what the storage needs to read the keys, so reading them does not need a query each.
+
+        Nothing is done by default, since most storages do not need to load anything.
+
+        :param keys: The keys that will be read.
+        """
+
+    def get_path(self, key: str):
+        """
+        Gets the path of the file the data of a key is in.
+
+        None is returned if the data is not in its own file, so it cannot be
+        sent by the reverse proxy.
+
+        :param key: The key.
+        """
+        return None
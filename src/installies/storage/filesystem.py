@@ -0,0 +1,69 @@
+import os
+import typing as t
+
+from datetime import datetime
+from installies.lib.files import FileSyncer, write_file_atomic
+from installies.storage.base import Storage, StorageStat, StorageKeyNotFound
+
+
+class FileSystemStorage(Storage):
+    """
+    A storage that stores the data of each key in its own file.
+
+    The files are spread over folders named after the first two pairs of
+    characters of their key, so no folder gets too many files. Files are
+    written atomically, so a file that exists always has all of its data.
+
+    :param directory: The directory to put the files in.
+    :param syncer: The syncer to sync the files with.
+    """
+
+    def __init__(self, directory: str, syncer: FileSyncer=None):
+        self.directory = directory
+        self.syncer = syncer
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[0:2], key[2:4], key)
+
+    def put(self, key: str, data: bytes):
+        if self.exists(key):
+            return
+
+        write_file_atomic(self.get_path(key), data, self.syncer)
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self.get_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise StorageKeyNotFound(key)
+
+    def stream(self, key: str, chunk_size: int=65536) -> t.Iterator[bytes]:
+        try:
+            f = open(self.get_path(key), 'rb')
+        except FileNotFoundError:
+            raise StorageKeyNotFound(key)
+
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if chunk == b'':
+                    break
+
+                yield chunk
+
+    def delete(self, key: str):
+        path = self.get_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.get_path(key))
+
+    def stat(self, key: str) -> StorageStat:
+        try:
+            file_stat = os.stat(self.get_path(key))
+        except FileNotFoundError:
+            raise StorageKeyNotFound(key)
+
+        return StorageStat(file_stat.st_size, datetime.utcfromtimestamp(file_stat.st_mtime))
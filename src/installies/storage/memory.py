@@ -0,0 +1,43 @@
+import threading
+
+from datetime import datetime
+from installies.storage.base import Storage, StorageStat, StorageKeyNotFound
+
+
+class MemoryStorage(Storage):
+    """
+    A storage that keeps all of its data in memory.
+
+    The data is lost when the process exits, and is not shared between
+    processes, so it is only meant for benchmarks and tests.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (bytes(data), datetime.utcnow())
+
+    def get(self, key: str) -> bytes:
+        item = self._items.get(key)
+        if item is None:
+            raise StorageKeyNotFound(key)
+
+        return item[0]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def exists(self, key: str) -> bool:
+        return key in self._items
+
+    def stat(self, key: str) -> StorageStat:
+        item = self._items.get(key)
+        if item is None:
+            raise StorageKeyNotFound(key)
+
+        return StorageStat(len(item[0]), item[1])
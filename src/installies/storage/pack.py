@@ -0,0 +1,355 @@
+from peewee import fn
+from collections import OrderedDict
+from contextlib import contextmanager
+from installies.config import database
+from installies.models.pack import PackEntry
+from installies.lib.files import FileSyncer, sync_path
+from installies.storage.base import Storage, StorageStat, StorageKeyNotFound
+
+import fcntl
+import mmap
+import os
+import re
+import threading
+import typing as t
+
+
+class PackStorage(Storage):
+    """
+    A storage that keeps data in large segment files, instead of a file for each key.
+
+    Data is appended to the newest segment until it is ``segment_size`` bytes,
+    then a new segment is started. Where each piece of data is, is stored in the
+    ``PackEntry`` table. Segments are read through ``mmap``, so reading data is
+    a slice of a mapped file instead of opening a file.
+
+    Deleting data only deletes its entry. The space is reclaimed by ``compact``.
+
+    Entries are cached, since they only change when their segment is compacted.
+    A cached entry whose segment is gone is loaded again. At most ``max_maps``
+    segments are kept mapped, and maps of segments that were removed are dropped,
+    so the space of compacted segments is freed.
+
+    :param directory: The directory to put the segments in.
+    :param segment_size: The size in bytes a segment can grow to before a new one is started.
+    :param syncer: The syncer to sync the segments with.
+    :param max_entries: The max amount of entries to cache.
+    :param max_maps: The max amount of segments to keep mapped.
+    """
+
+    segment_pattern = re.compile(r'^segment-(\d+)\.pack$')
+
+    def __init__(
+            self,
+            directory: str,
+            segment_size: int,
+            syncer: FileSyncer=None,
+            max_entries: int=10000,
+            max_maps: int=64,
+    ):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.syncer = syncer
+        self.max_entries = max_entries
+        self.max_maps = max_maps
+        self._entries = OrderedDict()
+        self._entries_lock = threading.Lock()
+        self._maps = OrderedDict()
+        self._maps_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def get_segment_path(self, segment: int) -> str:
+        """
+        Gets the path of a segment file.
+
+        :param segment: The number of the segment.
+        """
+        return os.path.join(self.directory, f'segment-{segment:06d}.pack')
+
+    def get_segments(self) -> list[int]:
+        """Gets the numbers of all the segments, from oldest to newest."""
+        if os.path.isdir(self.directory) is False:
+            return []
+
+        segments = []
+        for filename in os.listdir(self.directory):
+            match = self.segment_pattern.match(filename)
+            if match is not None:
+                segments.append(int(match.group(1)))
+
+        return sorted(segments)
+
+    def get_active_segment(self) -> int:
+        """Gets the number of the segment to append to. The storage has to be locked."""
+        segments = self.get_segments()
+        if segments == []:
+            return 1
+
+        newest = segments[-1]
+        if os.path.getsize(self.get_segment_path(newest)) >= self.segment_size:
+            return newest + 1
+
+        return newest
+
+    @contextmanager
+    def locked(self):
+        """Locks the storage, so no other thread or process can write to it."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        with self._write_lock:
+            with open(os.path.join(self.directory, 'pack.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, data: bytes) -> tuple[int, int]:
+        """
+        Appends data to the active segment. The storage has to be locked.
+
+        The segment and offset of the data are returned.
+
+        :param data: The data to append.
+        """
+        segment = self.get_active_segment()
+        path = self.get_segment_path(segment)
+
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            f.flush()
+
+            # with the always policy, the data is on disk before its entry is
+            if self.syncer is not None:
+                self.syncer.sync_data(f)
+
+        if self.syncer is not None:
+            self.syncer.written(path)
+
+        return segment, offset
+
+    def put(self, key: str, data: bytes):
+        # the cache is not used, since the key may have been deleted by another process
+        if self.has_entry(key):
+            return
+
+        with self.locked():
+            if self.has_entry(key):
+                return
+
+            segment, offset = self.append(data)
+            self.cache_entry(
+                PackEntry.create(key=key, segment=segment, offset=offset, length=len(data))
+            )
+
+    def get(self, key: str) -> bytes:
+        entry = self.get_entry(key)
+        try:
+            return self.read(entry)
+        except FileNotFoundError:
+            # the segment was compacted after the entry was read, so the entry is read
+            # again from the database, where its move was committed before the removal
+            self.forget_entry(key)
+            return self.read(self.get_entry(key))
+
+    def stream(self, key: str, chunk_size: int=65536) -> t.Iterator[bytes]:
+        # the data is sliced from the map, so it is never copied all at once
+        entry = self.get_entry(key)
+        try:
+            segment_map = self.get_map(entry.segment, entry.offset + entry.length)
+        except FileNotFoundError:
+            self.forget_entry(key)
+            entry = self.get_entry(key)
+            segment_map = self.get_map(entry.segment, entry.offset + entry.length)
+
+        end = entry.offset + entry.length
+        for start in range(entry.offset, end, chunk_size):
+            yield segment_map[start:min(start + chunk_size, end)]
+
+    def get_entry(self, key: str) -> PackEntry:
+        """
+        Gets the entry of a key.
+
+        ``StorageKeyNotFound`` is raised if the key is not stored.
+
+        :param key: The key.
+        """
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = PackEntry.get_or_none(PackEntry.key == key)
+        if entry is None:
+            raise StorageKeyNotFound(key)
+
+        self.cache_entry(entry)
+        return entry
+
+    def has_entry(self, key: str) -> bool:
+        """
+        Checks if a key has an entry in the database, without using the cache.
+
+        :param key: The key.
+        """
+        return PackEntry.select().where(PackEntry.key == key).exists()
+
+    def cache_entry(self, entry: PackEntry):
+        """
+        Adds an entry to the cache, removing the least recently used entries if it is full.
+
+        :param entry: The entry.
+        """
+        with self._entries_lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget_entry(self, key: str):
+        """
+        Removes an entry from the cache. Nothing happens if it is not cached.
+
+        :param key: The key of the entry.
+        """
+        with self._entries_lock:
+            self._entries.pop(key, None)
+
+    def preload(self, keys: list[str]):
+        with self._entries_lock:
+            missing = {key for key in keys if key not in self._entries}
+
+        if missing == set():
+            return
+
+        for entry in PackEntry.select().where(PackEntry.key.in_(missing)):
+            self.cache_entry(entry)
+
+    def read(self, entry: PackEntry) -> bytes:
+        """
+        Reads the data of an entry.
+
+        :param entry: The entry.
+        """
+        end = entry.offset + entry.length
+        return self.get_map(entry.segment, end)[entry.offset:end]
+
+    def get_map(self, segment: int, min_size: int):
+        """
+        Gets a memory map of a segment.
+
+        The segment is mapped again if it has grown past the end of its map.
+        ``FileNotFoundError`` is raised if the segment was removed, and its map is
+        dropped, so the space of the removed file can be freed.
+
+        :param segment: The number of the segment.
+        :param min_size: The size the map has to be.
+        """
+        path = self.get_segment_path(segment)
+
+        # maps that are dropped are not closed, since a stream may still be reading them.
+        # They are closed when the last read using them is done.
+        with self._maps_lock:
+            if os.path.exists(path) is False:
+                self._maps.pop(segment, None)
+                raise FileNotFoundError(path)
+
+            segment_map = self._maps.get(segment)
+
+            if segment_map is None or len(segment_map) < min_size:
+                with open(path, 'rb') as f:
+                    segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+                self._maps[segment] = segment_map
+
+            self._maps.move_to_end(segment)
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+
+            return segment_map
+
+    def exists(self, key: str) -> bool:
+        # a key deleted by another process is reported until its segment is compacted,
+        # which is why put checks the database instead.
+        try:
+            self.get_entry(key)
+        except StorageKeyNotFound:
+            return False
+
+        return True
+
+    def stat(self, key: str) -> StorageStat:
+        return StorageStat(self.get_entry(key).length)
+
+    def delete(self, key: str):
+        # the space is reclaimed when the segment is compacted
+        PackEntry.delete().where(PackEntry.key == key).execute()
+        self.forget_entry(key)
+
+    def compact(self, min_dead_ratio: float=0.5) -> int:
+        """
+        Rewrites segments that are mostly deleted data, and returns the amount of bytes reclaimed.
+
+        The live data of each segment with at least ``min_dead_ratio`` deleted
+        data is appended to the active segment, and the moves of its entries are
+        committed before the segment is removed, so other processes never read an
+        entry whose segment is gone. It has to be called outside a transaction. The
+        active segment is never compacted.
+
+        :param min_dead_ratio: The part of a segment that has to be deleted data to compact it.
+        """
+        reclaimed = 0
+
+        with self.locked():
+            active_segment = self.get_active_segment()
+            live_sizes = dict(
+                PackEntry
+                .select(PackEntry.segment, fn.SUM(PackEntry.length))
+                .group_by(PackEntry.segment)
+                .tuples()
+            )
+
+            for segment in self.get_segments():
+                if segment >= active_segment:
+                    continue
+
+                path = self.get_segment_path(segment)
+                size = os.path.getsize(path)
+                dead_size = size - live_sizes.get(segment, 0)
+
+                if size > 0 and dead_size / size < min_dead_ratio:
+                    continue
+
+                new_segments = set()
+                moved_keys = []
+                entries = PackEntry.select().where(PackEntry.segment == segment)
+                with database.atomic(), open(path, 'rb') as f:
+                    for entry in entries:
+                        f.seek(entry.offset)
+                        new_segment, new_offset = self.append(f.read(entry.length))
+                        new_segments.add(new_segment)
+
+                        entry.segment = new_segment
+                        entry.offset = new_offset
+                        entry.save()
+                        moved_keys.append(entry.key)
+
+                    # the moved data has to be on disk before the entries pointing to it are
+                    for new_segment in new_segments:
+                        sync_path(self.get_segment_path(new_segment))
+
+                for key in moved_keys:
+                    self.forget_entry(key)
+
+                # the segment is only removed once the moved entries are committed
+                os.remove(path)
+
+                with self._maps_lock:
+                    self._maps.pop(segment, None)
+
+                reclaimed += dead_size
+
+        return reclaimed